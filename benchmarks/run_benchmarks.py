@@ -0,0 +1,253 @@
+"""
+Headless performance benchmarks for startup, rendering, pricing and trading.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --sizes small,medium
+    python -m benchmarks.run_benchmarks --save-baseline
+
+Every metric is a time per operation in milliseconds, so lower is better.
+Results are written as JSON and compared against benchmarks/baseline.json;
+the run exits with status 1 if any metric regressed beyond the tolerance,
+is missing from the baseline, or if there is no baseline at all. The
+committed baseline was taken on a single-core Linux machine with the
+default arguments; on other hardware, take one with --save-baseline on the
+machine (e.g. the CI runner) that will run the comparisons.
+Each world also trades the best suggested trade run and fails the run if
+the gold it made differs from the predicted profit.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# Render without a window or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from game import Game
+from generate_world import generate_world
+from handlers.pricing_handler import PricingHandler
+from handlers.regional_economy import RegionalEconomy
+from handlers.trade_handler import BUY, SELL, OrderLine
+from rng_streams import RngStreams
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+
+# World sizes as generate_world() arguments
+WORLD_SIZES = {
+    "small": {"capitals": 4, "towns_per_capital": 2, "villages_per_town": 1, "items": 5},
+    "medium": {"capitals": 25, "towns_per_capital": 9, "villages_per_town": 10, "items": 100},
+    "large": {"capitals": 100, "towns_per_capital": 9, "villages_per_town": 10, "items": 200},
+}
+
+
+def time_per_op(func, repeat):
+    """Run func repeat times and return the mean time per call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def check_trade_run(game):
+    """
+    Trade the best suggested run and compare the gold it made with its predicted profit.
+
+    One item at one settlement is made cheap first, so there is always a
+    profitable run to check.
+
+    Returns:
+        List of human-readable mismatches
+    """
+    origin = next(s for s in game.settlements if any(entry.quantity > 0 for entry in s.inventory.values()))
+    entry = next(entry for entry in origin.inventory.values() if entry.quantity > 0)
+    entry.buy_price = 1
+    runs = game.route_optimizer.best_trades(origin, game.merchant, limit=1)
+    if not runs:
+        return [f"no trade run suggested from {origin.name} after making item {entry.id} cost 1 gold"]
+    run = runs[0]
+    destination = next(s for s in game.settlements if s.id == run.destination_id)
+    merchant, handler = game.merchant, game.trade_handler
+    gold = merchant.gold
+    handler.execute_order(merchant, origin, [OrderLine(item_id, quantity, BUY) for item_id, quantity in run.cargo])
+    paid = gold - merchant.gold
+    handler.execute_order(merchant, destination, [OrderLine(item_id, quantity, SELL) for item_id, quantity in run.cargo])
+    realized = merchant.gold - gold
+    problems = []
+    if paid != run.cost:
+        problems.append(f"trade run cost {paid} gold, predicted {run.cost}")
+    if realized != run.profit:
+        problems.append(f"trade run made {realized} gold, predicted {run.profit}")
+    return problems
+
+
+def bench_world(db_path, frames, trades, clicks, seed):
+    """
+    Time every benchmark on one world.
+
+    Returns:
+        Tuple of ({metric: ms}, list of failed correctness checks)
+    """
+    results = {}
+    rng = random.Random(seed)
+    # Same price trajectories (and so the same amount of work) on every run
+    RngStreams.reseed(seed)
+
+    start = time.perf_counter()
+    game = Game(db_path=db_path)
+    results["startup_ms"] = (time.perf_counter() - start) * 1000
+
+    try:
+        # Rendering: pan the camera across the map so chunk building is included
+        def draw_frame():
+            game.camera_x -= 7
+            game.camera_y -= 3
+            game.draw_world()
+        results["draw_world_ms"] = time_per_op(draw_frame, frames)
+
+        results["price_pass_scalar_ms"] = time_per_op(
+            lambda: [PricingHandler.update_settlement_prices(s) for s in game.settlements], 1)
+        results["price_pass_batch_ms"] = time_per_op(game.pricing_engine.update_prices, 3)
+
+        # Whole-world economy step, one kingdom per shard
+        economy = RegionalEconomy(game.pricing_engine, game.settlements, rng_streams=game.rng_streams)
+        try:
+            results["economy_step_ms"] = time_per_op(lambda: economy.step(background=False), 3)
+        finally:
+            economy.close()
+
+        # Suggested runs must make what they predict, on prices the passes above moved
+        problems = check_trade_run(game)
+
+        # Trading: buy one unit and sell it back through the trading UI
+        settlement = max(game.settlements, key=lambda s: len(s.inventory))
+        game.merchant.gold = 10 ** 9
+        item_id = next(iter(settlement.inventory))
+
+        def trade():
+            item = settlement.inventory.get(item_id)
+            if item is None or item.quantity <= 1:
+                settlement.add_item(item_id, 10)
+                item = settlement.inventory[item_id]
+            game.trading_ui.buy_item(game.merchant, settlement, item)
+            game.trading_ui.sell_item(game.merchant, settlement, game.merchant.inventory[item_id])
+        results["trade_roundtrip_ms"] = time_per_op(trade, trades)
+
+        # Bulk orders: buy one unit of up to ten items in one basket and sell the basket back
+        basket = list(settlement.inventory)[:10]
+        game.merchant.cart_capacity = 10 ** 9
+
+        def order_roundtrip():
+            for basket_item in basket:
+                if basket_item not in settlement.inventory or settlement.inventory[basket_item].quantity <= 1:
+                    settlement.add_item(basket_item, 10)
+            handler = game.trade_handler
+            handler.execute_order(game.merchant, settlement, [OrderLine(i, 1, BUY) for i in basket])
+            handler.execute_order(game.merchant, settlement, [OrderLine(i, 1, SELL) for i in basket])
+        results["order_roundtrip_ms"] = time_per_op(order_roundtrip, trades)
+
+        # Click hit-testing at random world positions, half of them on settlements
+        points = []
+        for _ in range(clicks):
+            if rng.random() < 0.5:
+                target = rng.choice(game.settlements)
+                points.append((target.x + rng.randint(-10, 10), target.y + rng.randint(-10, 10)))
+            else:
+                points.append((rng.uniform(0, game.world_width), rng.uniform(0, game.world_height)))
+        point_iter = iter(points)
+        results["click_hit_test_ms"] = time_per_op(
+            lambda: game.spatial_index.hit_test(*next(point_iter), padding=20), clicks)
+    finally:
+        game.shutdown()
+    return results, problems
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions and metrics the baseline lacks."""
+    regressions = []
+    for size, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(size, {}).get(metric)
+            if reference is None:
+                regressions.append(f"{size}.{metric}: {value:.3f}ms, not in the baseline")
+            elif value > reference * (1 + tolerance):
+                regressions.append(f"{size}.{metric}: {value:.3f}ms vs baseline {reference:.3f}ms "
+                                   f"(+{(value / reference - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run headless performance benchmarks")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"Comma-separated world sizes ({', '.join(WORLD_SIZES)})")
+    parser.add_argument("--frames", type=int, default=300, help="Frames drawn per world")
+    parser.add_argument("--trades", type=int, default=500, help="Buy/sell round trips per world")
+    parser.add_argument("--clicks", type=int, default=10000, help="Hit-tests per world")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before a metric counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pygame.init()
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    results = {}
+    problems = []
+    with tempfile.TemporaryDirectory() as world_dir:
+        for size in sizes:
+            db_path = os.path.join(world_dir, f"{size}.db")
+            generate_world(db_path, seed=args.seed, **WORLD_SIZES[size])
+            print(f"Benchmarking {size} world...")
+            results[size], world_problems = bench_world(db_path, args.frames, args.trades, args.clicks, args.seed)
+            for metric, value in results[size].items():
+                print(f"  {metric:<24} {value:10.3f} ms")
+            problems += [f"{size}: {problem}" for problem in world_problems]
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+    for problem in problems:
+        print(f"CHECK FAILED {problem}")
+    if problems:
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 1
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against baseline.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,13 @@
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 60  # Render frame cap
+
+# Fixed-timestep simulation: ticks per simulated second, independent of FPS
+SIM_TICKS_PER_SECOND = 60
+# Most simulation steps run in one frame at 1x speed before the backlog is dropped
+MAX_SIM_STEPS_PER_FRAME = 5
+# Selectable simulation speeds (+/- in game)
+TIME_SCALES = (0.25, 0.5, 1, 2, 4, 8)
 
 SETTLEMENTS = [
     {"name": "King's Haven", "type": "castle", "x": SCREEN_WIDTH//2, "y": SCREEN_HEIGHT//2},
@@ -22,3 +29,27 @@ SETTLEMENT_SIZES = {
     'town': 25,
     'village': 20
 }
+
+# Save games: binary snapshots (a full one, then deltas) written to SAVE_DIR
+SAVE_DIR = "saves"
+AUTOSAVE_INTERVAL = 3600  # Ticks between autosaves (one minute of simulation at 1x)
+SNAPSHOTS_PER_CHAIN = 10  # Saves per full snapshot; the rest are deltas
+
+# Random number streams (see rng_streams.py): pricing, economy_worker (passes priced on the
+# worker thread), regional_economy, restock, worldgen and autopilot each draw from their own
+# stream derived from RNG_SEED. None picks a new seed every run (it is logged);
+# RNG_STREAM_SEEDS pins single streams, e.g. {"pricing": 42}
+RNG_SEED = None
+RNG_STREAM_SEEDS = {}
+
+# Logging: format, file and per-subsystem levels (logger names follow the package layout)
+LOG_FILE = "game.log"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVELS = {
+    "": "INFO",  # Root logger and anything not listed below
+    "game": "INFO",
+    "models": "INFO",
+    "handlers": "INFO",
+    "database": "INFO",
+    "ui": "INFO",
+}
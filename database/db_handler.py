@@ -1,123 +1,175 @@
+import logging
 import sqlite3
 import os
-import random  # Add this import at the top
+import threading
+from rng_streams import RngStreams
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "game_data.db"
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class DatabaseHandler:
-    def __init__(self, db_path="game_data.db"):
-        print("Initializing DatabaseHandler...")
+    # Process-wide handlers keyed by absolute database path (see shared())
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        logger.info("Initializing DatabaseHandler...")
         self.db_path = db_path
+        self._local = threading.local()  # One sqlite connection per thread
         self.initialize_database()
 
+    @classmethod
+    def shared(cls, db_path=DEFAULT_DB_PATH):
+        """
+        Return the process-wide handler for db_path, creating it on first use.
+
+        The schema and seed checks in initialize_database only run once per
+        database file, no matter how many models ask for a handler.
+        """
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            handler = cls._instances.get(key)
+            if handler is None:
+                handler = cls(db_path)
+                cls._instances[key] = handler
+            return handler
+
+    @property
+    def conn(self):
+        """Connection owned by the calling thread, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers and the write-behind flusher work concurrently, and
+            # synchronous=NORMAL avoids an fsync on every commit
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection, if it has one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def initialize_database(self):
-        print("Connecting to database at:", self.db_path)
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        logger.info("Connecting to database at: %s", self.db_path)
         cursor = self.conn.cursor()
 
         # Execute schema.sql to create tables
         try:
-            with open('database/schema.sql', 'r') as schema_file:
+            with open(os.path.join(DATABASE_DIR, 'schema.sql'), 'r') as schema_file:
                 schema_script = schema_file.read()
                 cursor.executescript(schema_script)
                 self.conn.commit()
-                print("Database schema initialized successfully")
+                logger.info("Database schema initialized successfully")
         except Exception as e:
-            print(f"Error initializing database schema: {e}")
+            logger.error("Error initializing database schema: %s", e)
             self.conn.rollback()
 
+        # Databases created before settlement gold was persisted lack the column
+        columns = [row['name'] for row in cursor.execute('PRAGMA table_info(settlements)')]
+        if 'gold' not in columns:
+            cursor.execute('ALTER TABLE settlements ADD COLUMN gold INTEGER DEFAULT 1000')
+            self.conn.commit()
+
         # Check if settlements need to be initialized
         cursor.execute('SELECT COUNT(*) FROM settlements')
         if cursor.fetchone()[0] == 0:
-            print("Initializing settlements from SQL file...")
+            logger.info("Initializing settlements from SQL file...")
             try:
-                with open('database/init_settlements.sql', 'r') as sql_file:
+                with open(os.path.join(DATABASE_DIR, 'init_settlements.sql'), 'r') as sql_file:
                     sql_script = sql_file.read()
                     cursor.executescript(sql_script)
                     self.conn.commit()
-                    print("Settlements initialized successfully")
+                    logger.info("Settlements initialized successfully")
             except Exception as e:
-                print(f"Error initializing settlements: {e}")
+                logger.error("Error initializing settlements: %s", e)
                 self.conn.rollback()
 
         # Check if items need to be initialized
         cursor.execute('SELECT COUNT(*) FROM items')
         if cursor.fetchone()[0] == 0:
-            print("Initializing items from SQL file...")
+            logger.info("Initializing items from SQL file...")
             try:
-                with open('database/init_items.sql', 'r') as sql_file:
+                with open(os.path.join(DATABASE_DIR, 'init_items.sql'), 'r') as sql_file:
                     sql_script = sql_file.read()
                     cursor.executescript(sql_script)
                     self.conn.commit()
-                    print("Items initialized successfully")
+                    logger.info("Items initialized successfully")
             except Exception as e:
-                print(f"Error initializing items: {e}")
+                logger.error("Error initializing items: %s", e)
                 self.conn.rollback()
 
         # Populate settlement items
         cursor.execute('SELECT COUNT(*) FROM settlement_items')
         if cursor.fetchone()[0] == 0:
-            print("Populating settlement items...")
+            logger.info("Populating settlement items...")
             try:
                 settlements = self.load_settlements()
-                for settlement in settlements:
-                    self.populate_settlement_items(settlement['id'])
-                print("Settlement items populated successfully")
+                self.populate_settlement_items_bulk([settlement['id'] for settlement in settlements])
+                logger.info("Settlement items populated successfully")
             except Exception as e:
-                print(f"Error populating settlement items: {e}")
+                logger.error("Error populating settlement items: %s", e)
                 self.conn.rollback()
 
-        print("Database initialization complete")
+        logger.info("Database initialization complete")
 
     def get_items(self):
-        print("Fetching all items from the database...")
+        logger.debug("Fetching all items from the database...")
         cursor = self.conn.cursor()
         items = cursor.execute('SELECT * FROM items').fetchall()
-        print(f"Retrieved {len(items)} items.")
+        logger.debug("Retrieved %s items.", len(items))
         return items
 
     def get_item_by_id(self, item_id):
-        print(f"Fetching item with ID: {item_id}")
+        logger.debug("Fetching item with ID: %s", item_id)
         cursor = self.conn.cursor()
         item = cursor.execute('SELECT * FROM items WHERE id = ?', (item_id,)).fetchone()
         if item:
-            print(f"Item found: {item['name']}")
+            logger.debug("Item found: %s", item['name'])
         else:
-            print("Item not found.")
+            logger.warning("Item not found.")
         return item
 
     def get_settlement_items(self, settlement_id):
-        print(f"Fetching items for settlement ID: {settlement_id}")
+        logger.debug("Fetching items for settlement ID: %s", settlement_id)
         cursor = self.conn.cursor()
         items = cursor.execute('''
             SELECT i.*, si.quantity FROM items i
             JOIN settlement_items si ON i.id = si.item_id
             WHERE si.settlement_id = ?
         ''', (settlement_id,)).fetchall()
-        print(f"Retrieved {len(items)} items for settlement ID {settlement_id}.")
+        logger.debug("Retrieved %s items for settlement ID %s.", len(items), settlement_id)
         return items
 
     def update_price_modifier(self, settlement_id, modifier):
-        print(f"Updating price modifier for settlement ID {settlement_id} to {modifier}.")
+        logger.debug("Updating price modifier for settlement ID %s to %s.", settlement_id, modifier)
         self.conn.execute('''
             UPDATE settlements 
             SET base_price_modifier = ?
             WHERE id = ?
         ''', (modifier, settlement_id))
         self.conn.commit()
-        print("Price modifier updated.")
+        logger.debug("Price modifier updated.")
 
     def update_item_quantity(self, settlement_id, item_id, quantity):
-        print(f"Updating quantity for item ID {item_id} in settlement ID {settlement_id} to {quantity}.")
+        logger.debug("Updating quantity for item ID %s in settlement ID %s to %s.", item_id, settlement_id, quantity)
         self.conn.execute('''
             UPDATE settlement_items
             SET quantity = ?
             WHERE settlement_id = ? AND item_id = ?
         ''', (quantity, settlement_id, item_id))
         self.conn.commit()
-        print("Item quantity updated.")
+        logger.debug("Item quantity updated.")
 
     def insert_settlement(self, name, x, y, settlement_type):
-        print(f"Inserting settlement: {name}, Type: {settlement_type}, Location: ({x}, {y})")
+        logger.debug("Inserting settlement: %s, Type: %s, Location: (%s, %s)", name, settlement_type, x, y)
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO settlements (name, x, y, settlement_type)
@@ -125,11 +177,11 @@ class DatabaseHandler:
         ''', (name, x, y, settlement_type))
         self.conn.commit()
         settlement_id = cursor.lastrowid
-        print(f"Settlement inserted with ID: {settlement_id}")
+        logger.debug("Settlement inserted with ID: %s", settlement_id)
         return settlement_id  # Return the ID of the newly inserted settlement
 
     def insert_item(self, name, buy_price, sell_price, description, category):
-        print(f"Inserting item: {name}, Category: {category}")
+        logger.debug("Inserting item: %s, Category: %s", name, category)
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO items (name, buy_price, sell_price, description, category)
@@ -137,11 +189,11 @@ class DatabaseHandler:
         ''', (name, buy_price, sell_price, description, category))
         self.conn.commit()
         item_id = cursor.lastrowid
-        print(f"Item inserted with ID: {item_id}")
+        logger.debug("Item inserted with ID: %s", item_id)
         return item_id  # Return the ID of the newly inserted item
 
     def insert_settlement_item(self, settlement_id, item_id, quantity):
-        print(f"Inserting/Updating settlement_item: Settlement ID {settlement_id}, Item ID {item_id}, Quantity {quantity}")
+        logger.debug("Inserting/Updating settlement_item: Settlement ID %s, Item ID %s, Quantity %s", settlement_id, item_id, quantity)
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO settlement_items (settlement_id, item_id, quantity)
@@ -149,44 +201,52 @@ class DatabaseHandler:
             ON CONFLICT(settlement_id, item_id) DO UPDATE SET quantity = settlement_items.quantity + ?
         ''', (settlement_id, item_id, quantity, quantity))
         self.conn.commit()
-        print("Settlement item inserted/updated.")
+        logger.debug("Settlement item inserted/updated.")
 
     def populate_settlement_items(self, settlement_id):
-        print(f"Populating items for settlement ID {settlement_id}")
+        logger.debug("Populating items for settlement ID %s", settlement_id)
+        self.populate_settlement_items_bulk([settlement_id])
+
+    def populate_settlement_items_bulk(self, settlement_ids):
+        """Give each settlement a random quantity (5-20) of every item in one transaction."""
+        logger.info("Populating items for %s settlement(s)", len(settlement_ids))
         cursor = self.conn.cursor()
         
-        # Get all available items
+        # Get all available items; quantities come from the restock stream (config.RNG_SEED)
         items = self.get_items()
+        restock = RngStreams.shared().get("restock")
+        quantities = iter(restock.integers(5, 21, len(settlement_ids) * len(items)).tolist())
+        rows = [
+            (settlement_id, item['id'], next(quantities))
+            for settlement_id in settlement_ids
+            for item in items
+        ]
         
         try:
-            # For each item, insert a random quantity (5-20) into the settlement
-            for item in items:
-                quantity = random.randint(5, 20)
-                cursor.execute('''
-                    INSERT INTO settlement_items (settlement_id, item_id, quantity)
-                    VALUES (?, ?, ?)
-                ''', (settlement_id, item['id'], quantity))
-                print(f"Added {quantity}x of item {item['name']} to settlement {settlement_id}")
-            
+            cursor.executemany('''
+                INSERT INTO settlement_items (settlement_id, item_id, quantity)
+                VALUES (?, ?, ?)
+            ''', rows)
             self.conn.commit()
-            print(f"Successfully populated items for settlement {settlement_id}")
+            logger.info("Successfully populated %s settlement items", len(rows))
         except Exception as e:
-            print(f"Error populating items for settlement {settlement_id}: {e}")
+            logger.error("Error populating items for settlements %s: %s", settlement_ids, e)
             self.conn.rollback()
 
     def get_settlement_id_by_name(self, name):
         """Get settlement ID by name, returns None if not found."""
         try:
-            self.cursor.execute("SELECT id FROM settlements WHERE name = ?", (name,))
-            result = self.cursor.fetchone()
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT id FROM settlements WHERE name = ?", (name,))
+            result = cursor.fetchone()
             return result[0] if result else None
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
+            logger.error("Database error: %s", e)
             return None
 
     def load_settlements(self):
         """Load all settlements from database."""
-        print("Loading settlements from database...")
+        logger.debug("Loading settlements from database...")
         cursor = self.conn.cursor()
         
         # Get settlement counts by type
@@ -197,10 +257,104 @@ class DatabaseHandler:
         ''')
         counts = cursor.fetchall()
         for type_count in counts:
-            print(f"Found {type_count[1]} {type_count[0]}(s)")
+            logger.info("Found %s %s(s)", type_count[1], type_count[0])
 
         # Get all settlements
         cursor.execute('SELECT * FROM settlements ORDER BY settlement_type, name')
         settlements = cursor.fetchall()
-        print(f"Loaded {len(settlements)} total settlements")
+        logger.info("Loaded %s total settlements", len(settlements))
         return settlements
+
+    def get_all_settlement_items(self):
+        """
+        Fetch the stock of every settlement in a single query.
+
+        Returns:
+            Dict of settlement_id -> rows with the same columns as get_settlement_items()
+        """
+        cursor = self.conn.cursor()
+        rows = cursor.execute('''
+            SELECT i.*, si.settlement_id, si.quantity FROM settlement_items si
+            JOIN items i ON i.id = si.item_id
+            ORDER BY si.settlement_id
+        ''').fetchall()
+        items_by_settlement = {}
+        for row in rows:
+            items_by_settlement.setdefault(row['settlement_id'], []).append(row)
+        logger.info("Retrieved %s settlement items for %s settlements.", len(rows), len(items_by_settlement))
+        return items_by_settlement
+
+    def load_world(self):
+        """
+        Load settlements and their stock with a fixed number of set-based queries.
+
+        Settlements without any stock are populated in one batch first, so the
+        returned stock covers every settlement.
+
+        Returns:
+            Tuple of (settlement rows, {settlement_id: stock rows})
+        """
+        settlements = self.load_settlements()
+        items_by_settlement = self.get_all_settlement_items()
+        missing = [s['id'] for s in settlements if s['id'] not in items_by_settlement]
+        if missing:
+            self.populate_settlement_items_bulk(missing)
+            items_by_settlement = self.get_all_settlement_items()
+        return settlements, items_by_settlement
+
+    def load_merchant(self, merchant_id):
+        """
+        Load a merchant written back by write_state_batch.
+
+        Returns:
+            Tuple of (merchant row, cargo rows with the same columns as get_settlement_items()),
+            or None if the merchant has never been saved
+        """
+        cursor = self.conn.cursor()
+        merchant = cursor.execute('SELECT * FROM merchants WHERE id = ?', (merchant_id,)).fetchone()
+        if merchant is None:
+            return None
+        cargo = cursor.execute('''
+            SELECT i.*, mi.quantity FROM items i
+            JOIN merchant_items mi ON i.id = mi.item_id
+            WHERE mi.merchant_id = ?
+        ''', (merchant_id,)).fetchall()
+        logger.info("Loaded merchant %s with %s cargo item(s).", merchant_id, len(cargo))
+        return merchant, cargo
+
+    def write_state_batch(self, batch):
+        """
+        Apply a batch of settlement and merchant state in a single transaction.
+
+        Args:
+            batch: Dict produced by WriteBehindPersistence.flush() with row lists for
+                settlement_gold, settlement_items, settlement_items_removed,
+                merchants, merchant_items and merchant_items_removed
+
+        Raises:
+            sqlite3.Error: If the batch could not be written; nothing of it is applied
+        """
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE settlements SET gold = ? WHERE id = ?',
+                batch['settlement_gold'])
+            self.conn.executemany('''
+                INSERT INTO settlement_items (settlement_id, item_id, quantity)
+                VALUES (?, ?, ?)
+                ON CONFLICT(settlement_id, item_id) DO UPDATE SET quantity = excluded.quantity
+            ''', batch['settlement_items'])
+            self.conn.executemany(
+                'DELETE FROM settlement_items WHERE settlement_id = ? AND item_id = ?',
+                batch['settlement_items_removed'])
+            self.conn.executemany('''
+                INSERT INTO merchants (id, x, y, gold) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET x = excluded.x, y = excluded.y, gold = excluded.gold
+            ''', batch['merchants'])
+            self.conn.executemany('''
+                INSERT INTO merchant_items (merchant_id, item_id, quantity)
+                VALUES (?, ?, ?)
+                ON CONFLICT(merchant_id, item_id) DO UPDATE SET quantity = excluded.quantity
+            ''', batch['merchant_items'])
+            self.conn.executemany(
+                'DELETE FROM merchant_items WHERE merchant_id = ? AND item_id = ?',
+                batch['merchant_items_removed'])
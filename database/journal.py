@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from database.snapshot import STORE_ARRAYS, SnapshotCapture, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Player (or autopilot) actions, applied between simulation steps during a replay
+INPUT_EVENTS = ("destination", "travel", "teleport", "leave_trading", "order")
+# Price passes and economy steps, applied inside the simulation step they were recorded in
+PRICE_EVENTS = ("price_submit", "price_apply", "economy_submit", "economy_apply")
+
+def state_digest(game, worker_state=None):
+    """
+    Hash of the simulation state, used to check that a replay ended where the session did.
+
+    worker_state stands in for the EconomyWorker's seed state when the game
+    has no worker, as in a replay of an interactive session.
+    """
+    if game.economy_worker:
+        worker_state = game.economy_worker.get_state()
+    digest = hashlib.sha256()
+    store = game.inventory_store
+    for name in STORE_ARRAYS:
+        digest.update(np.ascontiguousarray(getattr(store, name)[:store.row_count]).tobytes())
+        cargo = game.merchant.inventory
+        digest.update(getattr(cargo.store, name)[cargo.row].tobytes())
+    merchant = game.merchant
+    scalars = [game.game_tick, [s.gold for s in game.settlements],
+               merchant.x, merchant.y, merchant.gold, merchant.current_load,
+               game.pricing_engine.rng.bit_generator.state,
+               worker_state]
+    digest.update(json.dumps(scalars).encode("utf-8"))
+    return digest.hexdigest()
+
+def read_journal(path):
+    """Yield the entries of a journal file in order."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class EventJournal:
+    """
+    Append-only log of every state-changing event in a session.
+
+    Each line is a JSON object stamped with the tick it happened on. A
+    session starts with a full snapshot of the game written next to the
+    journal, so a replay starts from exactly the state, RNG states included,
+    the events were recorded against (see replay.py); loading a save, the
+    only thing that resets the RNGs mid-run, starts a new session. Events
+    themselves carry no RNG state, so a journal grows with what happens, not
+    with the size of the generators. Like a save, the
+    baseline is copied a slice per update() and written on a background
+    thread; close() waits for it.
+    """
+
+    def __init__(self, path, game, cells_per_tick=500_000):
+        self.path = path
+        self.game = game
+        self.sessions = 0
+        self.cells_per_tick = cells_per_tick  # Inventory cells a baseline copies per update()
+        self._baseline = None  # (path, SnapshotCapture) of the baseline still being copied
+        self._writers = []  # Threads writing finished baselines
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+
+    @classmethod
+    def create(cls, directory, game):
+        """Start a new journal file named after the current time."""
+        name = time.strftime("journal_%Y%m%d-%H%M%S.jsonl")
+        return cls(os.path.join(directory, name), game)
+
+    def record(self, event_type, **fields):
+        """Append an event, stamped with the current tick."""
+        entry = {"tick": self.game.game_tick, "type": event_type}
+        entry.update(fields)
+        self._file.write(json.dumps(entry) + "\n")
+
+    def begin_session(self):
+        """Start a baseline snapshot of the game and a new session on it."""
+        self.finish_baseline()
+        self.sessions += 1
+        snapshot_name = f"{os.path.splitext(os.path.basename(self.path))[0]}-{self.sessions}.snap"
+        # Outside the save chain, so the next save's delta is unaffected
+        capture = SnapshotCapture(self.game, full=True, clear_dirty=False)
+        self._baseline = (os.path.join(os.path.dirname(self.path), snapshot_name), capture)
+        regional = self.game.regional_economy
+        self.record("session", snapshot=snapshot_name, db=os.path.abspath(self.game.db.db_path),
+                    regional=None if regional is None else regional.get_state())
+        logger.info("Journaling session %s to %s", self.sessions, self.path)
+
+    def update(self):
+        """Copy the next slice of a baseline in progress; call once per tick."""
+        if self._baseline is not None and self._baseline[1].step(self.cells_per_tick):
+            self._write_baseline()
+
+    def finish_baseline(self):
+        """Copy whatever is left of a baseline in progress and start writing it."""
+        if self._baseline is not None:
+            self._baseline[1].finish()
+            self._write_baseline()
+
+    def _write_baseline(self):
+        path, capture = self._baseline
+        self._baseline = None
+        writer = threading.Thread(target=write_snapshot, args=(path,) + capture.result(),
+                                  name="journal-baseline-writer", daemon=True)
+        writer.start()
+        self._writers = [w for w in self._writers if w.is_alive()] + [writer]
+
+    def end_session(self):
+        """Mark where the session ended, with a digest a replay must reproduce."""
+        self.record("session_end", digest=state_digest(self.game))
+        self._file.flush()
+
+    def close(self):
+        """Write the baseline still in progress and close the journal."""
+        self.finish_baseline()
+        for writer in self._writers:
+            writer.join()
+        self._file.close()
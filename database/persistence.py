@@ -0,0 +1,125 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindPersistence:
+    """
+    Collects dirty settlement and merchant state and writes it back in batches.
+
+    Trades only mark state as dirty. flush() snapshots the dirty rows on the
+    calling thread and hands them to a background writer, which applies each
+    batch in one transaction on its own connection, so the game loop never
+    waits on SQLite. A batch that fails is retried with backoff and then kept,
+    in order, ahead of the batches flushed after it, so a locked or busy
+    database delays the write-back instead of losing it.
+    """
+
+    def __init__(self, db, flush_interval=5.0, max_pending=500, max_attempts=4, retry_delay=0.1):
+        self.db = db
+        self.flush_interval = flush_interval  # Seconds between timed flushes
+        self.max_pending = max_pending  # Dirty rows that force an early flush
+        self.max_attempts = max_attempts  # Tries per write before waiting for the next flush
+        self.retry_delay = retry_delay  # Seconds before the first retry, doubled on each one
+        self._settlements = {}  # settlement id -> (settlement, dirty item ids)
+        self._merchants = {}  # merchant id -> (merchant, dirty item ids)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="persistence-writer", daemon=True)
+        self._writer.start()
+
+    def record_settlement(self, settlement, item_ids=()):
+        """Mark a settlement's gold and the given stock rows as dirty."""
+        _, dirty_items = self._settlements.setdefault(settlement.id, (settlement, set()))
+        dirty_items.update(item_ids)
+        self._pending += 1 + len(item_ids)
+
+    def record_merchant(self, merchant, item_ids=()):
+        """Mark a merchant's position, gold and the given cargo rows as dirty."""
+        _, dirty_items = self._merchants.setdefault(merchant.id, (merchant, set()))
+        dirty_items.update(item_ids)
+        self._pending += 1 + len(item_ids)
+
+    def record_trade(self, merchant, settlement, item_ids):
+        """Mark both sides of a trade as dirty."""
+        self.record_merchant(merchant, item_ids)
+        self.record_settlement(settlement, item_ids)
+
+    def maybe_flush(self):
+        """Flush if the size threshold or the flush interval has been reached."""
+        if self._pending >= self.max_pending or \
+           (self._pending and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Snapshot all dirty state and queue it for the writer thread."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        batch = {
+            'settlement_gold': [],
+            'settlement_items': [],
+            'settlement_items_removed': [],
+            'merchants': [],
+            'merchant_items': [],
+            'merchant_items_removed': [],
+        }
+        for settlement_id, (settlement, item_ids) in self._settlements.items():
+            batch['settlement_gold'].append((settlement.gold, settlement_id))
+            self._collect_items(settlement_id, settlement.inventory, item_ids,
+                                batch['settlement_items'], batch['settlement_items_removed'])
+        for merchant_id, (merchant, item_ids) in self._merchants.items():
+            batch['merchants'].append((merchant_id, merchant.x, merchant.y, merchant.gold))
+            self._collect_items(merchant_id, merchant.inventory, item_ids,
+                                batch['merchant_items'], batch['merchant_items_removed'])
+        self._settlements.clear()
+        self._merchants.clear()
+        self._pending = 0
+        self._queue.put(batch)
+
+    def close(self):
+        """Flush remaining state and wait for the writer to finish."""
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+
+    @staticmethod
+    def _collect_items(owner_id, inventory, item_ids, upserts, removals):
+        for item_id in item_ids:
+            item = inventory.get(item_id)
+            if item is not None and item.quantity > 0:
+                upserts.append((owner_id, item_id, item.quantity))
+            else:
+                removals.append((owner_id, item_id))
+
+    def _write_loop(self):
+        backlog = []  # Batches not written yet, oldest first
+        while True:
+            batch = self._queue.get()
+            if batch is not None:
+                backlog.append(batch)
+            backlog = self._write(backlog)
+            if batch is None:
+                break
+        if backlog:
+            logger.error("Giving up on %s unwritten state batch(es) at shutdown", len(backlog))
+        self.db.close()
+
+    def _write(self, backlog):
+        """Write batches in order, retrying with backoff; returns the ones still unwritten."""
+        for attempt in range(self.max_attempts):
+            try:
+                while backlog:
+                    self.db.write_state_batch(backlog[0])
+                    backlog.pop(0)
+                return backlog
+            except sqlite3.Error as e:
+                logger.warning("Writing state batch failed (attempt %s of %s): %s", attempt + 1, self.max_attempts, e)
+                if attempt + 1 < self.max_attempts:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        logger.warning("Keeping %s state batch(es) to retry with the next flush", len(backlog))
+        return backlog
@@ -15,7 +15,8 @@ CREATE TABLE IF NOT EXISTS settlements (
     x INTEGER NOT NULL,
     y INTEGER NOT NULL,
     settlement_type TEXT NOT NULL,
-    base_price_modifier REAL DEFAULT 1.0
+    base_price_modifier REAL DEFAULT 1.0,
+    gold INTEGER DEFAULT 1000
 );
 
 -- Table for settlement inventory
@@ -28,4 +29,22 @@ CREATE TABLE IF NOT EXISTS settlement_items (
     PRIMARY KEY (settlement_id, item_id)
 );
 
+-- Table for the player's merchant
+CREATE TABLE IF NOT EXISTS merchants (
+    id INTEGER PRIMARY KEY,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    gold INTEGER NOT NULL
+);
+
+-- Table for merchant cargo
+CREATE TABLE IF NOT EXISTS merchant_items (
+    merchant_id INTEGER,
+    item_id INTEGER,
+    quantity INTEGER NOT NULL,
+    FOREIGN KEY(merchant_id) REFERENCES merchants(id),
+    FOREIGN KEY(item_id) REFERENCES items(id),
+    PRIMARY KEY (merchant_id, item_id)
+);
+
 -- You can add initial data with INSERT statements if needed
@@ -0,0 +1,422 @@
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MMSNAP01"
+ALIGNMENT = 64  # Array data starts on 64-byte boundaries so it can be memory-mapped directly
+SNAPSHOT_FILE = re.compile(r"^(\d{8})\.(full|delta)\.snap$")
+
+STORE_ARRAYS = ("quantities", "buy_prices", "sell_prices", "present")
+
+def write_snapshot(path, header, arrays):
+    """
+    Write a snapshot file: magic, header length, JSON header, then raw aligned arrays.
+
+    The header lists every array's dtype, shape and offset from the start of
+    the data section. The file is written under a temporary name and renamed,
+    so a crash never leaves a half-written snapshot behind.
+    """
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header_bytes = json.dumps(dict(header, arrays=table)).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + table[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, path)
+
+def read_snapshot(path, mode="r"):
+    """
+    Open a snapshot file.
+
+    Arrays are memory-mapped rather than read, so opening is O(1) in the size
+    of the world; mode "c" maps them copy-on-write so they can be patched in
+    memory (e.g. with deltas) without touching the file.
+
+    Returns:
+        Tuple of (header dict, {name: array})
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    for name, spec in header.pop("arrays").items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec["dtype"], mode=mode,
+                                     offset=data_start + spec["offset"], shape=shape)
+    return header, arrays
+
+class SnapshotCapture:
+    """
+    Game state for one snapshot, with inventory rows copied over several ticks.
+
+    Scalar state (tick, merchant, camera, RNG, settlement gold) is taken when
+    the capture starts. Inventory rows are copied a slice per step(); a row
+    that is about to change before its turn is copied first (the store calls
+    copy_rows from before_write), so the finished snapshot shows every row as
+    it was when the capture started.
+
+    Full snapshots hold every inventory row. Deltas hold the rows whose stock
+    changed since the previous snapshot, and only the prices of held items
+    for rows that were merely repriced. clear_dirty=False takes a snapshot
+    outside the save chain (e.g. a journal baseline) without resetting what
+    the next delta will contain.
+    """
+
+    def __init__(self, game, full, clear_dirty=True):
+        store = game.inventory_store
+        self.store = store
+        row_count = store.row_count
+        if full:
+            rows = np.arange(row_count)
+            price_rows = np.zeros(0, dtype=np.intp)
+        else:
+            rows = np.flatnonzero(store.dirty[:row_count])
+            price_rows = np.flatnonzero(store.prices_dirty[:row_count] & ~store.dirty[:row_count])
+        if clear_dirty:
+            store.dirty[:] = False
+            store.prices_dirty[:] = False
+
+        self.slot = np.full(row_count, -1, dtype=np.intp)  # Row -> index into the stock arrays, -1 if price-only
+        self.slot[rows] = np.arange(len(rows))
+        self.pending = np.zeros(row_count, dtype=bool)  # Rows not copied yet
+        self.pending[rows] = True
+        self.pending[price_rows] = True
+        self.remaining = len(rows) + len(price_rows)
+        self.order = np.concatenate([rows, price_rows])  # Copy order of step()
+        self.cursor = 0
+        self._price_parts = []  # (rows, cols, buy prices, sell prices) of price-only rows copied so far
+
+        owners = [None] * row_count
+        for settlement in game.settlements:
+            owners[settlement.inventory.row] = settlement
+        arrays = {"rows": rows.astype(np.int64)}
+        for name in STORE_ARRAYS:
+            source = getattr(store, name)
+            arrays[name] = np.empty((len(rows),) + source.shape[1:], dtype=source.dtype)
+        arrays["gold"] = np.array([owners[row].gold if owners[row] else 0 for row in rows.tolist()], dtype=np.int64)
+        merchant = game.merchant
+        cargo = merchant.inventory
+        for name in STORE_ARRAYS:
+            arrays["merchant_" + name] = getattr(cargo.store, name)[cargo.row].copy()
+        if full:
+            arrays["settlement_ids"] = np.array([owner.id if owner else -1 for owner in owners], dtype=np.int64)
+            arrays["item_ids"] = np.asarray(store.item_ids, dtype=np.int64)
+        self.arrays = arrays
+
+        self.header = {
+            "kind": "full" if full else "delta",
+            "saved_at": time.time(),
+            "row_count": row_count,
+            "game_tick": game.game_tick,
+            "state": game.state.value,
+            "camera": [game.camera_x, game.camera_y],
+            "time_scale": game.time_scale,
+            "destination_id": game.destination_settlement.id if game.destination_settlement else None,
+            "current_settlement_id": game.current_settlement.id if game.current_settlement else None,
+            "merchant": {
+                "x": merchant.x, "y": merchant.y,
+                "target_x": merchant.target_x, "target_y": merchant.target_y,
+                "gold": merchant.gold, "current_load": merchant.current_load,
+                "arrived": merchant.arrived_at_settlement,
+                "waypoints": [list(point) for point in merchant.waypoints],
+                "leg": list(merchant.leg) if merchant.leg else None,
+                "leg_remaining": merchant.leg_remaining,
+            },
+            "rng": {
+                "pricing": game.pricing_engine.rng.bit_generator.state,
+                "streams": game.rng_streams.get_state(),
+                "worker": game.economy_worker.get_state() if game.economy_worker else None,
+            },
+        }
+        if self.remaining:
+            store.captures.append(self)
+
+    @property
+    def done(self):
+        return self.remaining == 0
+
+    def copy_rows(self, rows):
+        """Copy the given rows (an index or index array, repeats allowed) unless they were copied already."""
+        if np.ndim(rows) == 0:
+            if rows >= len(self.pending) or not self.pending[rows]:
+                return
+            todo = np.array([rows], dtype=np.intp)
+        else:
+            hit = np.zeros(len(self.pending), dtype=bool)
+            rows = np.asarray(rows)
+            hit[rows[rows < len(hit)]] = True
+            todo = np.flatnonzero(hit & self.pending)
+            if not len(todo):
+                return
+        self.pending[todo] = False
+        self.remaining -= len(todo)
+
+        store = self.store
+        slots = self.slot[todo]
+        stock = slots >= 0
+        if stock.any():
+            for name in STORE_ARRAYS:
+                self.arrays[name][slots[stock]] = getattr(store, name)[todo[stock]]
+        priced = todo[~stock]
+        if len(priced):
+            held_rows, held_cols = np.nonzero(store.present[priced])
+            held_rows = priced[held_rows]
+            self._price_parts.append((held_rows, held_cols, store.buy_prices[held_rows, held_cols],
+                                      store.sell_prices[held_rows, held_cols]))
+        if not self.remaining:
+            store.captures.remove(self)
+
+    def step(self, max_cells):
+        """
+        Copy the next slice of about max_cells inventory cells.
+
+        Returns:
+            True once every row has been copied
+        """
+        count = max(1, max_cells // max(1, self.store.quantities.shape[1]))
+        end = min(self.cursor + count, len(self.order))
+        if end > self.cursor:
+            self.copy_rows(self.order[self.cursor:end])
+        self.cursor = end
+        return self.done
+
+    def finish(self):
+        """Copy every row that is still pending."""
+        self.step(len(self.order) * max(1, self.store.quantities.shape[1]))
+
+    def result(self):
+        """
+        The finished snapshot; safe to call from another thread once done.
+
+        Returns:
+            Tuple of (header dict, {name: array})
+        """
+        arrays = dict(self.arrays)
+        if self.header["kind"] == "delta":
+            no_indexes = np.zeros(0, dtype=np.int64)
+            no_prices = np.zeros(0, dtype=self.store.buy_prices.dtype)
+            parts = self._price_parts or [(no_indexes, no_indexes, no_prices, no_prices)]
+            for index, name in enumerate(("price_rows", "price_cols", "price_buy", "price_sell")):
+                arrays[name] = np.concatenate([part[index] for part in parts])
+        return self.header, arrays
+
+def restore_state(game, header, arrays):
+    """
+    Load a merged snapshot (see SnapshotManager.load) into a game on the same world.
+
+    Raises:
+        ValueError: If the snapshot was taken on a world with different settlements or items
+    """
+    store = game.inventory_store
+    row_count = header["row_count"]
+    if row_count != store.row_count or \
+       not np.array_equal(arrays["item_ids"], np.asarray(store.item_ids)):
+        raise ValueError("Snapshot was taken on a different world")
+    owners = {}
+    for settlement in game.settlements:
+        owners[settlement.inventory.row] = settlement
+    expected = np.array([owners[row].id if row in owners else -1 for row in range(row_count)], dtype=np.int64)
+    if not np.array_equal(arrays["settlement_ids"], expected):
+        raise ValueError("Snapshot was taken on a different world")
+
+    store.before_write(np.arange(row_count))  # A snapshot still being copied keeps the pre-restore rows
+    for name in STORE_ARRAYS:
+        getattr(store, name)[:row_count] = arrays[name]
+    store.dirty[:] = False
+    store.prices_dirty[:] = False
+    store.versions[:row_count] += 1  # Every row may have changed
+    for row, gold in zip(arrays["rows"].tolist(), arrays["gold"].tolist()):
+        if row in owners:
+            owners[row].gold = gold
+
+    merchant = game.merchant
+    cargo = merchant.inventory
+    for name in STORE_ARRAYS:
+        getattr(cargo.store, name)[cargo.row] = arrays["merchant_" + name]
+    state = header["merchant"]
+    merchant.x, merchant.y = state["x"], state["y"]
+    merchant.target_x, merchant.target_y = state["target_x"], state["target_y"]
+    merchant.gold = state["gold"]
+    merchant.current_load = state["current_load"]
+    merchant.arrived_at_settlement = state["arrived"]
+    merchant.restore_route(state["waypoints"], state["leg"], state["leg_remaining"])
+
+    by_id = {settlement.id: settlement for settlement in game.settlements}
+    game.game_tick = header["game_tick"]
+    game.state = type(game.state)(header["state"])
+    game.camera_x, game.camera_y = header["camera"]
+    game.time_scale = header["time_scale"]
+    game.destination_settlement = by_id.get(header["destination_id"])
+    game.current_settlement = by_id.get(header["current_settlement_id"])
+    game.rng_streams.set_state(header["rng"]["streams"])
+    game.pricing_engine.rng.bit_generator.state = header["rng"]["pricing"]
+    if game.economy_worker and header["rng"].get("worker") is not None:
+        game.economy_worker.set_state(header["rng"]["worker"])
+    # Drift schedules restart from the restored tick; passes still in flight predate the restore
+    game.price_scheduler.watch(game.settlements, game.game_tick)
+    game.pricing_engine.discard_pending()
+    if game.regional_economy:
+        game.regional_economy.discard_pending()
+
+class SnapshotManager:
+    """
+    Saves and loads binary game snapshots in a directory.
+
+    A save is a full snapshot followed by delta snapshots holding only the
+    inventory rows that changed since the previous save; every full_every
+    saves a new full snapshot starts a fresh chain and the old one is
+    deleted. save() takes the scalar state right away; update() then copies
+    the inventory rows a slice per tick (see SnapshotCapture), and encoding
+    and writing happen on a background thread.
+    """
+
+    def __init__(self, directory, full_every=10, cells_per_tick=500_000):
+        self.directory = directory
+        self.full_every = full_every  # Saves per chain, including the full one
+        self.cells_per_tick = cells_per_tick  # Inventory cells a save copies per update()
+        self._capture = None  # SnapshotCapture of the save still being copied
+        self.sequence = self._latest_sequence() + 1
+        self.chain_length = 0  # Saves in the current chain; 0 means the next save must be full
+        self.chain_rows = None  # Row count the current chain was taken with
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="snapshot-writer", daemon=True)
+        self._writer.start()
+
+    def save(self, game, full=False):
+        """Snapshot the game; full is forced when the delta chain is empty, long or outdated."""
+        full = full or self.chain_length == 0 or self.chain_length >= self.full_every or \
+            self.chain_rows != game.inventory_store.row_count
+        self.finish_capture()
+        capture = SnapshotCapture(game, full)
+        capture.header["sequence"] = self.sequence
+        self._capture = capture
+        self.sequence += 1
+        self.chain_length = 1 if full else self.chain_length + 1
+        self.chain_rows = capture.header["row_count"]
+        logger.debug("Started %s snapshot %s (%s rows to copy)",
+                     capture.header["kind"], capture.header["sequence"], capture.remaining)
+
+    def update(self):
+        """Copy the next slice of a save in progress; call once per tick."""
+        if self._capture is not None and self._capture.step(self.cells_per_tick):
+            self._queue.put(self._capture)
+            self._capture = None
+
+    def finish_capture(self):
+        """Copy whatever is left of a save in progress and queue it for writing."""
+        if self._capture is not None:
+            self._capture.finish()
+            self._queue.put(self._capture)
+            self._capture = None
+
+    def has_snapshot(self):
+        return any(kind == "full" for _, kind, _ in self._files())
+
+    def load(self):
+        """
+        Read the newest full snapshot and apply the deltas saved after it.
+
+        Returns:
+            Tuple of (header of the newest snapshot, merged arrays), or None if there is no save
+        """
+        self.wait()
+        files = self._files()
+        fulls = [i for i, (_, kind, _) in enumerate(files) if kind == "full"]
+        if not fulls:
+            return None
+        chain = files[fulls[-1]:]
+        header, arrays = read_snapshot(chain[0][2], mode="c")
+        arrays = dict(arrays)
+        gold = np.zeros(header["row_count"], dtype=np.int64)
+        gold[arrays["rows"]] = arrays["gold"]
+        for _, _, path in chain[1:]:
+            header, delta = read_snapshot(path)
+            rows = delta["rows"]
+            for name in STORE_ARRAYS:
+                arrays[name][rows] = delta[name]
+            gold[rows] = delta["gold"]
+            if "price_rows" in delta:
+                price_rows, price_cols = delta["price_rows"], delta["price_cols"]
+                arrays["buy_prices"][price_rows, price_cols] = delta["price_buy"]
+                arrays["sell_prices"][price_rows, price_cols] = delta["price_sell"]
+            for name in STORE_ARRAYS:
+                arrays["merchant_" + name] = delta["merchant_" + name]
+        arrays["rows"] = np.arange(header["row_count"])
+        arrays["gold"] = gold
+        # The next save continues this chain
+        self.chain_length = len(chain)
+        self.chain_rows = header["row_count"]
+        return header, arrays
+
+    def wait(self):
+        """Block until every started snapshot is on disk."""
+        self.finish_capture()
+        self._queue.join()
+
+    def close(self):
+        """Write started snapshots and stop the writer thread."""
+        self.finish_capture()
+        self._queue.put(None)
+        self._writer.join()
+
+    def _files(self):
+        """Snapshot files in the directory as sorted (sequence, kind, path) tuples."""
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for name in os.listdir(self.directory):
+            match = SNAPSHOT_FILE.match(name)
+            if match:
+                files.append((int(match.group(1)), match.group(2), os.path.join(self.directory, name)))
+        return sorted(files)
+
+    def _latest_sequence(self):
+        files = self._files()
+        return files[-1][0] if files else 0
+
+    def _write_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    break
+                start = time.perf_counter()
+                header, arrays = job.result()
+                sequence = header["sequence"]
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{sequence:08d}.{header['kind']}.snap")
+                write_snapshot(path, header, arrays)
+                if header["kind"] == "full":
+                    # The new chain supersedes everything saved before it
+                    for old_sequence, _, old_path in self._files():
+                        if old_sequence < sequence:
+                            os.remove(old_path)
+                logger.debug("Wrote %s in %.1f ms", path, (time.perf_counter() - start) * 1000)
+            except Exception:
+                logger.exception("Failed to write snapshot")
+            finally:
+                self._queue.task_done()
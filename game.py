@@ -1,38 +1,97 @@
+import logging
 import pygame
-import random
 import math
+import time
 from enum import Enum
-from models.item import Item
+from models.item_catalog import ItemCatalog
+from models.inventory import InventoryStore
 from models.settlement import Settlement
 from models.merchant import Merchant
+from models.road_network import RoadNetwork
+from models.spatial_index import SpatialGrid
+from models.pathfinding import RoutePlanner
 from ui.trading_ui import TradingUI
-from database.db_handler import DatabaseHandler  # Ensure DatabaseHandler is imported
+from ui.world_layer import WorldLayerCache
+from ui.text_cache import TextCache
+from ui.profiler import FrameProfiler
+from database.db_handler import DatabaseHandler, DEFAULT_DB_PATH  # Ensure DatabaseHandler is imported
+from database.persistence import WriteBehindPersistence
+from database.snapshot import SnapshotManager, restore_state
+from database.journal import EventJournal
+from handlers.batch_pricing import BatchPricingEngine
+from handlers.price_scheduler import PriceScheduler
+from handlers.economy_worker import EconomyWorker
+from handlers.regional_economy import RegionalEconomy
+from handlers.trade_handler import TradeHandler
+from handlers.route_optimizer import TradeRouteOptimizer
+from rng_streams import RngStreams
+import config
+
+logger = logging.getLogger(__name__)
 
 class GameState(Enum):
     WORLD_MAP = "world_map"
     TRADING = "trading"
     DEBUG_MENU = "debug_menu"  # Add new state
 
+# Ticks between economy steps (price drift)
+ECONOMY_STEP_INTERVAL = 100
+
 class Game:
-    def __init__(self):
-        print("Starting Game Initialization...")
+    def __init__(self, headless=False, db_path=DEFAULT_DB_PATH, regional_economy=False, save_dir=None, resume=False,
+                 journal_dir=None, persist=True, load_stock=True):
+        logger.info("Starting Game Initialization...")
         self.width = 800
         self.height = 600
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("Medieval Merchant")
+        self.headless = headless  # Run the simulation without opening a window
+        if self.headless:
+            self.screen = None
+            self.text_cache = None
+        else:
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption("Medieval Merchant")
+            self.text_cache = TextCache.shared()
         self.clock = pygame.time.Clock()
         self.state = GameState.WORLD_MAP
-        self.debug_font = pygame.font.Font(None, 20)
         self.debug_menu_visible = False  # Toggle for debug menu
-        print(f"Game state set to {self.state}.")
+        self.profiler = FrameProfiler()
+        logger.debug("Game state set to %s.", self.state)
         
         # Initialize database and world size first
-        self.db = DatabaseHandler()
+        self.db = DatabaseHandler.shared(db_path)
+        # persist=False keeps the database untouched, e.g. while replaying a journal
+        self.persistence = WriteBehindPersistence(self.db) if persist else None
+        self.journal = None
+        self.trade_handler = TradeHandler(self.persistence)
+        self.snapshots = SnapshotManager(save_dir, config.SNAPSHOTS_PER_CHAIN) if save_dir else None
+        saved = self.snapshots.load() if resume and self.snapshots else None
         self.world_width = 4000
         self.world_height = 3000
         
-        # Load settlements before creating merchant
-        self.settlements = self.generate_settlements()
+        # Load settlements before creating merchant (stock comes from the save when resuming,
+        # or from a snapshot the caller restores, e.g. a journal replay)
+        self.settlements = self.generate_settlements(with_stock=saved is None and load_stock)
+        # Generated worlds can be larger than the default map
+        if self.settlements:
+            self.world_width = max(self.world_width, max(s.x for s in self.settlements) + 500)
+            self.world_height = max(self.world_height, max(s.y for s in self.settlements) + 500)
+        self.spatial_index = SpatialGrid(self.settlements)
+        self.road_network = RoadNetwork(self.settlements)
+        self.route_planner = RoutePlanner(self.road_network)
+        self.route_optimizer = TradeRouteOptimizer(self.settlements, self.route_planner)
+        # Pricing and autopilot draw from their own seeded streams (config.RNG_SEED)
+        self.rng_streams = RngStreams.shared()
+        self.pricing_engine = BatchPricingEngine(self.settlements, rng=self.rng_streams.get("pricing"))
+        # Interactive play prices off the render thread; headless runs stay inline and reproducible
+        self.economy_worker = None if self.headless else EconomyWorker(self.pricing_engine, self.rng_streams)
+        # Optionally step price drift for the whole world, one kingdom per shard
+        self.regional_economy = None
+        if regional_economy:
+            self.regional_economy = RegionalEconomy(self.pricing_engine, self.settlements,
+                                                    rng_streams=self.rng_streams)
+        self.price_scheduler = PriceScheduler(
+            self.pricing_engine, self.settlements, worker=self.economy_worker,
+            drift_interval=ECONOMY_STEP_INTERVAL, economy=self.regional_economy)
         
         # Find Western Capital for starting position
         capitals = [s for s in self.settlements if s.settlement_type == "capital"]
@@ -42,32 +101,61 @@ class Game:
             start_x = western_capital.x - 100
             start_y = western_capital.y
         else:
-            print("Warning: No capital settlements found. Using default starting position.")
+            logger.warning("No capital settlements found. Using default starting position.")
             start_x = self.world_width // 2
             start_y = self.world_height // 2
         
         # Initialize merchant at starting position
-        self.merchant = Merchant(start_x, start_y)
+        self.merchant = Merchant(start_x, start_y, db=self.db,
+                                 inventory=InventoryStore(self.item_catalog).new_inventory())
+        # Continue with the merchant the last session wrote back (snapshots restore their own)
+        if saved is None and load_stock:
+            self.load_merchant()
         
-        # Initialize other game components
-        self.trading_ui = TradingUI(self.width, self.height)
+        # Initialize other game components (no UI is needed when running headless)
+        self.trading_ui = None if self.headless else TradingUI(self.width, self.height, self.trade_handler)
+        self.world_layer = None if self.headless else WorldLayerCache(
+            self.world_width, self.world_height, self.settlements, self.road_network, self.spatial_index)
         self.current_settlement = None
         self.selected_settlement = None
         self.destination_settlement = None
         self.game_tick = 0
         
         # Initialize camera position centered on merchant
-        self.camera_x = self.width//2 - start_x
-        self.camera_y = self.height//2 - start_y
+        self.camera_x = self.width//2 - self.merchant.x
+        self.camera_y = self.height//2 - self.merchant.y
+
+        # Fixed-timestep simulation; rendering interpolates between the last two steps
+        self.sim_dt = 1.0 / config.SIM_TICKS_PER_SECOND
+        self.time_scale = 1
+        self.snapshot_render_state()
+
+        if saved:
+            self.load_snapshot(saved)
+        elif resume:
+            logger.warning("No saved game found; starting a new session.")
+
+        # Record every state-changing event from here on, starting from a baseline snapshot
+        if journal_dir:
+            self.journal = EventJournal.create(journal_dir, self)
+            self.trade_handler.journal = self.journal
+            self.price_scheduler.journal = self.journal
+            self.journal.begin_session()
         
-        print("Game Initialization Complete.")
+        logger.info("Game Initialization Complete.")
 
-    def generate_settlements(self):
-        print("Loading settlements from database...")
+    def generate_settlements(self, with_stock=True):
+        logger.debug("Loading settlements from database...")
         settlements = []
         
-        # Load settlement data from database
-        db_settlements = self.db.load_settlements()
+        # Load settlements and all their stock in a few bulk queries
+        if with_stock:
+            db_settlements, items_by_settlement = self.db.load_world()
+        else:
+            db_settlements, items_by_settlement = self.db.load_settlements(), {}
+        # All settlement stock lives in one array-backed store, one row per settlement
+        self.item_catalog = ItemCatalog.shared(self.db)
+        self.inventory_store = InventoryStore(self.item_catalog, rows=len(db_settlements))
         
         # Create Settlement objects from database data
         for settlement_data in db_settlements:
@@ -76,17 +164,32 @@ class Game:
                 y=settlement_data['y'],
                 name=settlement_data['name'],
                 settlement_type=settlement_data['settlement_type'],
-                id=settlement_data['id']
+                id=settlement_data['id'],
+                db=self.db,
+                items_data=items_by_settlement.get(settlement_data['id'], []),
+                gold=settlement_data['gold'],
+                inventory=self.inventory_store.new_inventory()
             )
-            # Populate items if needed
-            if not self.db.get_settlement_items(settlement.id):
-                self.db.populate_settlement_items(settlement.id)
             settlements.append(settlement)
-            print(f"Loaded Settlement: {settlement.name} ({settlement.settlement_type}) with ID {settlement.id}")
+            logger.debug("Loaded Settlement: %s (%s) with ID %s", settlement.name, settlement.settlement_type, settlement.id)
         
-        print(f"Total settlements loaded: {len(settlements)}")
+        logger.info("Total settlements loaded: %s", len(settlements))
         return settlements
 
+    def load_merchant(self):
+        """Restore the merchant's position, gold and cargo from the database, if it was saved."""
+        saved = self.db.load_merchant(self.merchant.id)
+        if saved is None:
+            return
+        row, cargo = saved
+        self.merchant.teleport(row['x'], row['y'])
+        self.merchant.gold = row['gold']
+        for item in cargo:
+            self.merchant.add_item(item['id'], item['quantity'])
+        logger.info("Merchant resumed at (%s, %s) with %s gold and %s/%s cargo",
+                    self.merchant.x, self.merchant.y, self.merchant.gold,
+                    self.merchant.current_load, self.merchant.cart_capacity)
+
     def update_camera(self):
         # Camera follows merchant with smooth movement
         target_x = self.width//2 - self.merchant.x
@@ -96,6 +199,32 @@ class Game:
         self.camera_x += (target_x - self.camera_x) * 0.1
         self.camera_y += (target_y - self.camera_y) * 0.1
 
+    def snapshot_render_state(self):
+        """Remember merchant and camera positions as the start of the next interpolation."""
+        self.previous_render_state = (self.merchant.x, self.merchant.y, self.camera_x, self.camera_y)
+
+    def interpolated_render_state(self, alpha):
+        """
+        Blend merchant and camera positions between the previous and current step.
+
+        Args:
+            alpha: Fraction of a simulation step elapsed since the last update (0-1)
+
+        Returns:
+            Tuple of (merchant_x, merchant_y, camera_x, camera_y)
+        """
+        current = (self.merchant.x, self.merchant.y, self.camera_x, self.camera_y)
+        return tuple(prev + (cur - prev) * alpha
+                     for prev, cur in zip(self.previous_render_state, current))
+
+    def change_time_scale(self, direction):
+        """Step the simulation speed up (direction > 0) or down through config.TIME_SCALES."""
+        scales = config.TIME_SCALES
+        index = scales.index(self.time_scale) if self.time_scale in scales else scales.index(1)
+        index = max(0, min(len(scales) - 1, index + direction))
+        self.time_scale = scales[index]
+        logger.info("Simulation speed set to x%s", self.time_scale)
+
     def world_to_screen(self, x, y):
         """Convert world coordinates to screen coordinates"""
         return (int(x + self.camera_x), int(y + self.camera_y))
@@ -104,104 +233,26 @@ class Game:
         """Convert screen coordinates to world coordinates"""
         return (int(x - self.camera_x), int(y - self.camera_y))
 
-    def draw_world(self):
-        # Draw terrain (simple for now)
-        self.screen.fill((34, 139, 34))  # Green background for grass
-        
-        # Draw grid for reference (optional)
-        grid_size = 100
-        for x in range(0, self.world_width, grid_size):
-            screen_x = x + self.camera_x
-            if 0 <= screen_x <= self.width:
-                pygame.draw.line(self.screen, (0, 100, 0), 
-                               (screen_x, 0), 
-                               (screen_x, self.height))
-        for y in range(0, self.world_height, grid_size):
-            screen_y = y + self.camera_y
-            if 0 <= screen_y <= self.height:
-                pygame.draw.line(self.screen, (0, 100, 0), 
-                               (0, screen_y), 
-                               (self.width, screen_y))
-
-        # Categorize settlements
-        castle = None
-        capitals = []
-        towns = []
-        villages = []
-        
-        for settlement in self.settlements:
-            if settlement.settlement_type == "castle":
-                castle = settlement
-            elif settlement.settlement_type == "capital":
-                capitals.append(settlement)
-            elif settlement.settlement_type == "town":
-                towns.append(settlement)
-            elif settlement.settlement_type == "village":
-                villages.append(settlement)
-
-        # Draw paths in hierarchical order
-        # 1. Major roads between capitals (thick brown roads)
-        for i in range(len(capitals)):
-            for j in range(i + 1, len(capitals)):
-                start = self.world_to_screen(capitals[i].x, capitals[i].y)
-                end = self.world_to_screen(capitals[j].x, capitals[j].y)
-                # Draw thick brown road with black border
-                pygame.draw.line(self.screen, (101, 67, 33), start, end, 8)  # Main road
-                pygame.draw.line(self.screen, (139, 69, 19), start, end, 6)  # Road center
-
-        # 2. Regional roads from capitals to their towns (medium roads)
-        for capital in capitals:
-            cap_pos = self.world_to_screen(capital.x, capital.y)
-            # Find towns that belong to this capital's territory
-            for town in towns:
-                # Calculate if town belongs to this capital's territory
-                dist_to_capital = math.sqrt((town.x - capital.x)**2 + (town.y - capital.y)**2)
-                closest_capital = min(capitals, key=lambda c: 
-                    math.sqrt((town.x - c.x)**2 + (town.y - c.y)**2))
-                
-                # Only connect if this is the closest capital
-                if closest_capital == capital and dist_to_capital < 1000:
-                    town_pos = self.world_to_screen(town.x, town.y)
-                    pygame.draw.line(self.screen, (139, 119, 101), cap_pos, town_pos, 4)
-
-        # 3. Local roads from towns to nearby villages (thin roads)
-        for town in towns:
-            town_pos = self.world_to_screen(town.x, town.y)
-            # Find closest villages
-            nearby_villages = []
-            for village in villages:
-                dist = math.sqrt((town.x - village.x)**2 + (town.y - village.y)**2)
-                if dist < 500:  # Only connect to very close villages
-                    village_pos = self.world_to_screen(village.x, village.y)
-                    nearby_villages.append((dist, village_pos, village))
-            
-            # Connect only to the closest villages (max 2 per town)
-            nearby_villages.sort(key=lambda x: x[0])
-            for _, village_pos, _ in nearby_villages[:2]:
-                pygame.draw.line(self.screen, (160, 140, 120), town_pos, village_pos, 2)
-
-        # Draw all settlements with screen coordinate conversion
-        for settlement in self.settlements:
-            screen_pos = self.world_to_screen(settlement.x, settlement.y)
-            # Only draw if on screen
-            if (-settlement.size <= screen_pos[0] <= self.width + settlement.size and
-                -settlement.size <= screen_pos[1] <= self.height + settlement.size):
-                pygame.draw.circle(self.screen, settlement.color, screen_pos, settlement.size)
-                # Draw settlement name
-                font = pygame.font.Font(None, 24)
-                text = font.render(settlement.name, True, (255, 255, 255))
-                self.screen.blit(text, (screen_pos[0] - text.get_width()//2, 
-                                      screen_pos[1] + settlement.size + 5))
+    def draw_world(self, alpha=1.0):
+        merchant_x, merchant_y, camera_x, camera_y = self.interpolated_render_state(alpha)
+
+        # Draw terrain, grid, roads and settlements from the cached static layer
+        with self.profiler.phase("world_layer"):
+            self.world_layer.draw(self.screen, camera_x, camera_y)
 
         # Draw merchant with screen coordinate conversion
-        merchant_pos = self.world_to_screen(self.merchant.x, self.merchant.y)
+        merchant_pos = (int(merchant_x + camera_x), int(merchant_y + camera_y))
         self.merchant.draw(self.screen, merchant_pos)
 
         # Draw cargo capacity
-        font = pygame.font.Font(None, 36)
-        cargo_text = font.render(f"Cargo: {self.merchant.current_load}/{self.merchant.cart_capacity}", 
-                               True, (255, 255, 255))
+        cargo_text = self.text_cache.render(f"Cargo: {self.merchant.current_load}/{self.merchant.cart_capacity}", 
+                                            36, (255, 255, 255))
         self.screen.blit(cargo_text, (10, 10))
+
+        # Show the simulation speed when it is not real time
+        if self.time_scale != 1:
+            speed_text = self.text_cache.render(f"Speed: x{self.time_scale}", 24, (255, 255, 0))
+            self.screen.blit(speed_text, (10, 40))
         
         # Optionally: Draw a marker at merchant's target position
         if not self.merchant.arrived_at_settlement:
@@ -226,7 +277,7 @@ class Game:
         
         # Draw settlement list
         y = 10
-        header = self.debug_font.render("DEBUG MENU (Press F3 to toggle)", True, (255, 255, 0))
+        header = self.text_cache.render("DEBUG MENU (Press F3 to toggle)", 20, (255, 255, 0))
         self.screen.blit(header, (10, y))
         y += 30
         
@@ -234,15 +285,15 @@ class Game:
         settlement_types = ["castle", "capital", "town", "village"]
         for stype in settlement_types:
             # Draw type header
-            type_text = self.debug_font.render(f"--- {stype.upper()} ---", True, (0, 255, 0))
+            type_text = self.text_cache.render(f"--- {stype.upper()} ---", 20, (0, 255, 0))
             self.screen.blit(type_text, (10, y))
             y += 20
             
             # List settlements of this type
             for settlement in [s for s in self.settlements if s.settlement_type == stype]:
-                text = self.debug_font.render(
+                text = self.text_cache.render(
                     f"{settlement.name} ({settlement.x}, {settlement.y})", 
-                    True, 
+                    20, 
                     (255, 255, 255)
                 )
                 rect = text.get_rect(x=10, y=y)
@@ -264,9 +315,23 @@ class Game:
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     if self.state == GameState.TRADING:
-                        self.state = GameState.WORLD_MAP
+                        self.leave_trading()
                 elif event.key == pygame.K_F3:  # Toggle debug menu
                     self.debug_menu_visible = not self.debug_menu_visible
+                elif event.key == pygame.K_F4:  # Toggle profiler overlay
+                    self.profiler.visible = not self.profiler.visible
+                elif event.key == pygame.K_F5:  # Dump recent frame timings
+                    self.profiler.dump()
+                elif event.key == pygame.K_F7:  # Suggest trade runs from here
+                    self.suggest_trades()
+                elif event.key == pygame.K_F6:  # Quicksave
+                    self.save_snapshot(full=True)
+                elif event.key == pygame.K_F9:  # Quickload
+                    self.load_snapshot()
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):  # Fast-forward
+                    self.change_time_scale(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):  # Slow down
+                    self.change_time_scale(-1)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
                     if self.debug_menu_visible:
@@ -280,9 +345,8 @@ class Game:
                                     rect = pygame.Rect(10, y, 290, 20)
                                     if rect.collidepoint(pygame.mouse.get_pos()):
                                         # Teleport merchant to settlement
-                                        self.merchant.x = settlement.x
-                                        self.merchant.y = settlement.y
-                                        print(f"DEBUG: Teleported to {settlement.name}")
+                                        self.teleport(settlement.x, settlement.y)
+                                        logger.info("Teleported to %s", settlement.name)
                                         return True
                                     y += 20
                                 y += 10  # Space between categories
@@ -293,58 +357,130 @@ class Game:
                     world_pos = self.screen_to_world(*screen_pos)
                     if self.state == GameState.WORLD_MAP:
                         # Check for settlement clicks first
-                        clicked_settlement = None
-                        for settlement in self.settlements:
-                            distance = math.sqrt((world_pos[0] - settlement.x)**2 + 
-                                              (world_pos[1] - settlement.y)**2)
-                            if distance < settlement.size + 20:
-                                clicked_settlement = settlement
-                                break
+                        clicked_settlement = self.spatial_index.hit_test(*world_pos, padding=20)
                         
                         if clicked_settlement:
-                            # Set destination and log event
-                            self.destination_settlement = clicked_settlement
-                            self.merchant.target_x = clicked_settlement.x
-                            self.merchant.target_y = clicked_settlement.y
-                            self.merchant.arrived_at_settlement = False
-                            print(f"Merchant destination set to Settlement ID {settlement.id}: {settlement.name}")
+                            self.set_destination(clicked_settlement)
                         else:
                             # Clear destination if clicking empty space
-                            self.destination_settlement = None
-                            self.merchant.target_x = world_pos[0]
-                            self.merchant.target_y = world_pos[1]
-                            self.merchant.arrived_at_settlement = False
+                            self.travel_to(world_pos[0], world_pos[1])
                     elif self.state == GameState.TRADING:
-                        self.trading_ui.handle_click(pygame.mouse.get_pos(), self.current_settlement, self.merchant)
+                        self.trading_ui.handle_click(pygame.mouse.get_pos(), self.current_settlement, self.merchant,
+                                                     bulk=bool(pygame.key.get_mods() & pygame.KMOD_SHIFT))
         return True
 
+    def set_destination(self, settlement):
+        """Send the merchant towards a settlement."""
+        if self.journal:
+            self.journal.record("destination", settlement=settlement.id)
+        self.destination_settlement = settlement
+        self.merchant.set_route(self.plan_route(settlement))
+        logger.info("Merchant destination set to Settlement ID %s: %s", settlement.id, settlement.name)
+
+    def travel_to(self, x, y):
+        """Send the merchant straight to a point on the map."""
+        if self.journal:
+            self.journal.record("travel", x=x, y=y)
+        self.destination_settlement = None
+        self.merchant.travel_to(x, y)
+
+    def teleport(self, x, y):
+        """Move the merchant to a point instantly (debug menu)."""
+        if self.journal:
+            self.journal.record("teleport", x=x, y=y)
+        self.merchant.teleport(x, y)
+        self.snapshot_render_state()  # Don't interpolate across the jump
+
+    def leave_trading(self):
+        """Close the trading screen and return to the map."""
+        if self.journal:
+            self.journal.record("leave_trading")
+        self.state = GameState.WORLD_MAP
+        self.current_settlement = None
+
+    def suggest_trades(self, limit=5):
+        """Log the most profitable trade runs from the settlement nearest to the merchant."""
+        nearest = self.spatial_index.nearest(self.merchant.x, self.merchant.y)
+        if not nearest:
+            return []
+        start = time.perf_counter()
+        runs = self.route_optimizer.best_trades(nearest[0], self.merchant, limit)
+        nodes = self.road_network.nodes
+        for run in runs:
+            cargo = ", ".join(f"{quantity}x {self.item_catalog.get(item_id).name}" for item_id, quantity in run.cargo)
+            logger.info("Trade run %s -> %s: buy %s for %s gold, sell for %s gold profit (%.0f px)",
+                        nodes[run.origin_id].name, nodes[run.destination_id].name,
+                        cargo, run.cost, run.profit, run.travel_time)
+        logger.info("Found %s trade runs from %s in %.1f ms", len(runs), nearest[0].name,
+                    (time.perf_counter() - start) * 1000)
+        return runs
+
+    def plan_route(self, settlement):
+        """
+        Return merchant waypoints to a settlement, using roads when that is faster.
+
+        The merchant walks off-road to the nearest settlement, then follows the
+        fastest road route from there; if that is slower than walking straight
+        to the destination, or there is no road connection, it walks straight.
+        """
+        direct = [(settlement.x, settlement.y, 1.0)]
+        nearest = self.spatial_index.nearest(self.merchant.x, self.merchant.y)
+        if not nearest:
+            return direct
+        start = nearest[0]
+        route = self.route_planner.find_route(start.id, settlement.id)
+        if not route:
+            return direct
+        approach = math.hypot(start.x - self.merchant.x, start.y - self.merchant.y)
+        road_time = approach + self.route_planner.route_time(start.id, route)
+        if road_time >= math.hypot(settlement.x - self.merchant.x, settlement.y - self.merchant.y):
+            return direct
+        nodes = self.road_network.nodes
+        waypoints = [(start.x, start.y, 1.0)] if approach > 0 else []
+        for settlement_id, road_class in route:
+            node = nodes[settlement_id]
+            waypoints.append((node.x, node.y, RoutePlanner.ROAD_SPEEDS[road_class]))
+        return waypoints
+
     def update(self):
+        """Advance the simulation by one fixed step."""
+        self.snapshot_render_state()
         self.game_tick += 1
+        if self.persistence:
+            self.persistence.maybe_flush()
+        if self.snapshots:
+            if self.game_tick % config.AUTOSAVE_INTERVAL == 0:
+                self.save_snapshot()
+            self.snapshots.update()  # Copies a slice of a save in progress
+        if self.journal:
+            self.journal.update()  # Copies a slice of a session baseline in progress
         self.update_camera()  # Update camera position
         
         if self.state == GameState.WORLD_MAP:
-            # Update settlement prices periodically
-            if self.game_tick % 100 == 0:  # Only update prices every 100 ticks
-                for settlement in self.settlements:
-                    settlement.update_prices(self.game_tick)
+            # Reprice settlements whose stock changed or whose price drift is due
+            with self.profiler.phase("price_pass"):
+                self.price_scheduler.update(self.game_tick)
             
             if self.merchant.move():  # If merchant just arrived
                 if self.destination_settlement:
                     distance = math.sqrt((self.merchant.x - self.destination_settlement.x)**2 + 
                                       (self.merchant.y - self.destination_settlement.y)**2)
                     if distance < self.destination_settlement.size + 5:
-                        print("\n=== Entering Trading Mode ===")
-                        print(f"Current Settlement: {self.destination_settlement.name}")
-                        print(f"Settlement inventory items: {len(self.destination_settlement.get_inventory_items())}")
-                        print(f"Merchant inventory items: {len(self.merchant.get_inventory_items())}")
+                        logger.info("Entering trading mode at %s (%s settlement items, %s merchant items)",
+                                    self.destination_settlement.name,
+                                    len(self.destination_settlement.inventory),
+                                    len(self.merchant.get_inventory_items()))
                         self.state = GameState.TRADING
                         self.current_settlement = self.destination_settlement
-                        self.trading_ui.current_category = None
+                        if self.price_scheduler.is_stale(self.current_settlement, self.game_tick):
+                            self.price_scheduler.recompute_now(self.current_settlement, self.game_tick)
+                        if self.trading_ui:
+                            self.trading_ui.current_category = None
                         self.destination_settlement = None
 
-    def draw(self):
+    def draw(self, alpha=1.0):
         if self.state == GameState.WORLD_MAP:
-            self.draw_world()
+            self.draw_world(alpha)
             if self.debug_menu_visible:
                 self.draw_debug_menu()
         elif self.state == GameState.TRADING:
@@ -357,17 +493,131 @@ class Game:
             # Draw trading UI
             self.trading_ui.draw(self.screen, self.current_settlement, self.merchant)
 
+        if self.profiler.visible:
+            self.profiler.draw(self.screen, self.text_cache)
+
+    def present(self):
         pygame.display.flip()
 
+    def run_headless(self, ticks=None):
+        """
+        Run the world simulation without a display, as fast as the CPU allows.
+
+        Args:
+            ticks: Number of ticks to simulate, or None to run until interrupted
+
+        Returns:
+            Dict with the number of simulated ticks, elapsed seconds and ticks/sec
+        """
+        logger.info("Starting headless simulation (%s ticks)...", ticks if ticks is not None else 'unlimited')
+        start_tick = self.game_tick
+        start_time = time.perf_counter()
+        try:
+            while ticks is None or self.game_tick - start_tick < ticks:
+                self.autopilot()
+                self.update()
+        except KeyboardInterrupt:
+            logger.info("Headless simulation interrupted.")
+        elapsed = time.perf_counter() - start_time
+        simulated = self.game_tick - start_tick
+        ticks_per_sec = simulated / elapsed if elapsed > 0 else 0.0
+        self.shutdown()
+        logger.info("Simulated %s ticks in %.2fs (%.0f ticks/sec)", simulated, elapsed, ticks_per_sec)
+        return {"ticks": simulated, "seconds": elapsed, "ticks_per_sec": ticks_per_sec}
+
+    def autopilot(self):
+        """Stand in for the player: leave trading screens and travel to random settlements."""
+        if self.state == GameState.TRADING:
+            self.leave_trading()
+        if (self.state == GameState.WORLD_MAP and self.destination_settlement is None
+                and self.merchant.arrived_at_settlement and self.settlements):
+            rng = self.rng_streams.get("autopilot")
+            self.set_destination(self.settlements[rng.integers(len(self.settlements))])
+
     def run(self):
-        print("Starting game loop...")
+        """
+        Main loop: step the simulation at a fixed rate and render as often as the display allows.
+
+        Frame time (scaled by the time scale) is accumulated and consumed in
+        fixed simulation steps, so merchant travel and repricing advance at the
+        same rate whatever the frame rate. If frames fall too far behind, the
+        backlog past MAX_SIM_STEPS_PER_FRAME is dropped instead of compounding.
+        """
+        logger.info("Starting game loop...")
         running = True
+        accumulator = 0.0
+        previous_time = time.perf_counter()
         while running:
-            running = self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
-        print("Game loop has ended.")
+            self.profiler.begin_frame()
+            now = time.perf_counter()
+            accumulator += (now - previous_time) * self.time_scale
+            previous_time = now
+
+            with self.profiler.phase("handle_events"):
+                running = self.handle_events()
+
+            max_steps = max(1, math.ceil(config.MAX_SIM_STEPS_PER_FRAME * self.time_scale))
+            steps = 0
+            with self.profiler.phase("update"):
+                while accumulator >= self.sim_dt and steps < max_steps:
+                    self.update()
+                    accumulator -= self.sim_dt
+                    steps += 1
+            if accumulator >= self.sim_dt:
+                # Spiral-of-death guard: let the simulation fall behind rather than catch up forever
+                logger.debug("Dropping %.0f simulation steps of backlog", accumulator / self.sim_dt)
+                accumulator %= self.sim_dt
+
+            with self.profiler.phase("draw"):
+                self.draw(accumulator / self.sim_dt)
+            with self.profiler.phase("display.flip"):
+                self.present()
+            self.profiler.end_frame()
+            self.clock.tick(config.FPS)
+        self.shutdown()
+        logger.info("Game loop has ended.")
+
+    def save_snapshot(self, full=False):
+        """Save the session; it is copied over the next ticks and written in the background."""
+        if self.snapshots:
+            self.snapshots.save(self, full=full)
+            logger.info("Saved game at tick %s", self.game_tick)
+
+    def load_snapshot(self, saved=None):
+        """
+        Restore the latest save (or an already loaded one) into this session.
+
+        Returns:
+            True if a save was restored
+        """
+        if saved is None:
+            saved = self.snapshots.load() if self.snapshots else None
+        if saved is None:
+            logger.warning("No saved game to load.")
+            return False
+        header, arrays = saved
+        restore_state(self, header, arrays)
+        self.snapshot_render_state()
+        if self.journal:
+            self.journal.begin_session()  # Events from here on apply to the restored state
+        logger.info("Loaded game saved at tick %s", self.game_tick)
+        return True
+
+    def shutdown(self):
+        """Stop the economy workers, save and journal the session and write unsaved trades to the database."""
+        if self.snapshots:
+            self.save_snapshot()
+            self.snapshots.close()
+        if self.economy_worker:
+            self.economy_worker.close()
+        if self.regional_economy:
+            self.regional_economy.close()
+        if self.journal:
+            self.journal.end_session()
+            self.journal.close()
+        if self.persistence:
+            self.persistence.record_merchant(self.merchant)  # Position and gold, even without a trade
+            self.persistence.close()
 
 if __name__ == "__main__":
     game = Game()
@@ -0,0 +1,183 @@
+import argparse
+import math
+import os
+import random
+import sqlite3
+import time
+from database.db_handler import DATABASE_DIR
+from rng_streams import RngStreams
+
+# Building blocks for procedural names
+NAME_PREFIXES = ["Ash", "Black", "Bright", "Cold", "Dun", "East", "Elder", "Fair", "Fern", "Frost",
+                 "Gold", "Green", "Grey", "High", "Iron", "Kings", "Long", "Mill", "Moss", "North",
+                 "Oak", "Pine", "Raven", "Red", "River", "Salt", "Silver", "South", "Stone", "Storm",
+                 "Sun", "Thorn", "West", "White", "Wild", "Wolf"]
+NAME_SUFFIXES = ["bridge", "brook", "burg", "cliff", "cove", "crest", "dale", "fall", "ford", "gate",
+                 "haven", "hold", "hollow", "keep", "marsh", "mead", "mere", "moor", "port", "reach",
+                 "rest", "ridge", "shire", "stead", "vale", "watch", "well", "wick", "wood"]
+
+# Building blocks for procedural catalog items: category -> base goods
+ITEM_CATEGORIES = {
+    "Mineral": ["Iron Ore", "Copper Ore", "Tin", "Coal", "Salt", "Silver Ore", "Marble"],
+    "Food": ["Wheat", "Barley", "Cheese", "Fish", "Apples", "Honey", "Ale", "Bread"],
+    "Crafting Material": ["Leather", "Wool", "Timber", "Linen", "Rope", "Copper Wire", "Wax"],
+    "Medicinal": ["Herbs", "Tonic", "Poultice", "Salve", "Bitterroot"],
+    "Luxury": ["Silk", "Spices", "Wine", "Dye", "Amber", "Perfume"],
+    "Tools": ["Nails", "Hammers", "Ploughs", "Needles", "Buckets"]
+}
+ITEM_QUALITIES = ["Crude", "Common", "Fine", "Superior", "Royal", "Northern", "Southern",
+                  "Eastern", "Western", "Aged", "Fresh", "Rare"]
+
+KINGDOM_SPACING = 2400  # Distance between neighbouring capitals
+TOWN_RADIUS = (300, 900)  # Towns stay within the regional road range of their capital
+VILLAGE_RADIUS = (150, 450)  # Villages stay within the local road range of their town
+WORLD_MARGIN = 500
+
+
+class NameGenerator:
+    """Produces unique place names from prefix/suffix pairs, numbering repeats."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.used = {}
+
+    def next(self):
+        base = self.rng.choice(NAME_PREFIXES) + self.rng.choice(NAME_SUFFIXES)
+        count = self.used.get(base, 0) + 1
+        self.used[base] = count
+        return base if count == 1 else f"{base} {count}"
+
+
+def generate_items(rng, count):
+    """Return catalog rows (id, name, buy_price, sell_price, description, category)."""
+    goods = [(category, good) for category, names in ITEM_CATEGORIES.items() for good in names]
+    items = []
+    for item_id in range(1, count + 1):
+        category, good = goods[(item_id - 1) % len(goods)]
+        tier = (item_id - 1) // len(goods)
+        if tier == 0:
+            name = good
+        elif tier <= len(ITEM_QUALITIES):
+            name = f"{ITEM_QUALITIES[tier - 1]} {good}"
+        else:
+            name = f"{ITEM_QUALITIES[(tier - 1) % len(ITEM_QUALITIES)]} {good} {tier}"
+        buy_price = rng.randint(5, 200)
+        sell_price = max(1, int(buy_price * 0.8))
+        items.append((item_id, name, buy_price, sell_price, f"Trade good: {name.lower()}.", category))
+    return items
+
+
+def generate_settlements(rng, capitals, towns_per_capital, villages_per_town):
+    """
+    Lay out kingdoms on a jittered grid around a central castle.
+
+    Returns:
+        List of (id, name, x, y, settlement_type) rows with non-negative coordinates
+    """
+    names = NameGenerator(rng)
+    side = max(1, math.ceil(math.sqrt(capitals)))
+    offset = WORLD_MARGIN + TOWN_RADIUS[1] + VILLAGE_RADIUS[1]
+    world_size = offset * 2 + (side - 1) * KINGDOM_SPACING
+    rows = [(1, "Imperial Citadel", world_size // 2, world_size // 2, "castle")]
+
+    def place(center_x, center_y, radius_range):
+        angle = rng.uniform(0, 2 * math.pi)
+        radius = rng.uniform(*radius_range)
+        return int(center_x + math.cos(angle) * radius), int(center_y + math.sin(angle) * radius)
+
+    for kingdom in range(capitals):
+        jitter = KINGDOM_SPACING // 8
+        cap_x = offset + (kingdom % side) * KINGDOM_SPACING + rng.randint(-jitter, jitter)
+        cap_y = offset + (kingdom // side) * KINGDOM_SPACING + rng.randint(-jitter, jitter)
+        rows.append((len(rows) + 1, f"{names.next()} Crown", cap_x, cap_y, "capital"))
+        for _ in range(towns_per_capital):
+            town_x, town_y = place(cap_x, cap_y, TOWN_RADIUS)
+            rows.append((len(rows) + 1, names.next(), town_x, town_y, "town"))
+            for _ in range(villages_per_town):
+                village_x, village_y = place(town_x, town_y, VILLAGE_RADIUS)
+                rows.append((len(rows) + 1, names.next(), max(0, village_x), max(0, village_y), "village"))
+    return rows
+
+
+def generate_stock(rng, settlement_count, item_count, items_per_settlement):
+    """Yield (settlement_id, item_id, quantity) rows, a random subset of goods per settlement."""
+    item_ids = list(range(1, item_count + 1))
+    per_settlement = min(items_per_settlement, item_count)
+    for settlement_id in range(1, settlement_count + 1):
+        for item_id in sorted(rng.sample(item_ids, per_settlement)):
+            yield (settlement_id, item_id, rng.randint(5, 20))
+
+
+def write_world(db_path, items, settlements, stock):
+    """Create db_path from schema.sql and bulk-insert the generated world in one transaction."""
+    conn = sqlite3.connect(db_path)
+    # Nothing to protect while building a fresh file, so skip journaling and fsyncs
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    with open(os.path.join(DATABASE_DIR, 'schema.sql'), 'r') as schema_file:
+        conn.executescript(schema_file.read())
+    with conn:
+        conn.executemany('''
+            INSERT INTO items (id, name, buy_price, sell_price, description, category)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', items)
+        conn.executemany('''
+            INSERT INTO settlements (id, name, x, y, settlement_type)
+            VALUES (?, ?, ?, ?, ?)
+        ''', settlements)
+        conn.executemany('''
+            INSERT INTO settlement_items (settlement_id, item_id, quantity)
+            VALUES (?, ?, ?)
+        ''', stock)
+    stock_rows = conn.execute('SELECT COUNT(*) FROM settlement_items').fetchone()[0]
+    conn.close()
+    return stock_rows
+
+
+def generate_world(db_path, capitals=4, towns_per_capital=2, villages_per_town=1,
+                   items=5, items_per_settlement=20, seed=None, overwrite=False):
+    """
+    Generate a seeded world into a new SQLite file.
+
+    seed=None seeds the generator from the worldgen stream (config.RNG_SEED).
+
+    Returns:
+        Dict with the number of settlements, items and stock rows written
+    """
+    if os.path.exists(db_path):
+        if not overwrite:
+            raise FileExistsError(f"{db_path} already exists (use overwrite to replace it)")
+        os.remove(db_path)
+    rng = random.Random(RngStreams.shared().seed_for("worldgen") if seed is None else seed)
+    item_rows = generate_items(rng, items)
+    settlement_rows = generate_settlements(rng, capitals, towns_per_capital, villages_per_town)
+    stock = generate_stock(rng, len(settlement_rows), items, items_per_settlement)
+    stock_rows = write_world(db_path, item_rows, settlement_rows, stock)
+    return {"settlements": len(settlement_rows), "items": len(item_rows), "stock_rows": stock_rows}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a procedural world database for stress testing")
+    parser.add_argument("db_path", help="SQLite file to create")
+    parser.add_argument("--capitals", type=int, default=100, help="Number of kingdoms")
+    parser.add_argument("--towns-per-capital", type=int, default=9)
+    parser.add_argument("--villages-per-town", type=int, default=10)
+    parser.add_argument("--items", type=int, default=100, help="Size of the item catalog")
+    parser.add_argument("--items-per-settlement", type=int, default=20,
+                        help="Number of catalog items stocked by each settlement")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="World seed (default: the worldgen stream seeded by config.RNG_SEED)")
+    parser.add_argument("--overwrite", action="store_true", help="Replace db_path if it exists")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    counts = generate_world(args.db_path, args.capitals, args.towns_per_capital, args.villages_per_town,
+                            args.items, args.items_per_settlement, args.seed, args.overwrite)
+    print(f"Generated {counts['settlements']} settlements, {counts['items']} items and "
+          f"{counts['stock_rows']} stock rows in {time.perf_counter() - start:.2f}s -> {args.db_path}")
+
+if __name__ == "__main__":
+    main()
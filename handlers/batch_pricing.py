@@ -0,0 +1,208 @@
+import itertools
+from dataclasses import dataclass
+import numpy as np
+from handlers.pricing_handler import PricingHandler
+from models.inventory import PRICE_MAX
+
+@dataclass(frozen=True)
+class PricingJob:
+    """
+    Read-only snapshot of the stock and prices a price pass needs.
+
+    Taken on the main thread so the pass itself can run anywhere. Entries are
+    flattened (settlement, item) pairs; entry_rows index into settlement_ids
+    and store_rows, entry_cols are InventoryStore columns.
+    """
+    sequence: int
+    settlement_ids: tuple
+    stock_versions: tuple
+    store_rows: np.ndarray
+    entry_rows: np.ndarray
+    entry_cols: np.ndarray
+    entry_item_ids: np.ndarray
+    base_prices: np.ndarray
+    quantities: np.ndarray
+    base_demand: np.ndarray
+    type_modifiers: np.ndarray
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """Prices computed for a PricingJob, ready to be applied on the main thread."""
+    job: PricingJob
+    buy_prices: np.ndarray
+    sell_prices: np.ndarray
+
+def _frozen(array):
+    array = np.ascontiguousarray(array)
+    array.setflags(write=False)
+    return array
+
+class BatchPricingEngine:
+    """
+    Reprices every item of many settlements at once with NumPy.
+
+    Applies the same rules as PricingHandler.update_settlement_prices, but
+    reads and writes the settlements' shared InventoryStore arrays directly,
+    so a full repricing pass is a handful of vectorized operations instead of
+    two calculate_price calls per item.
+    """
+
+    def __init__(self, settlements, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._sequence = itertools.count()
+        self.last_priced = {}  # settlement id -> sequence of the pass that last set its prices
+        self.min_sequence = 0  # Passes older than this are discarded, see discard_pending
+        self.load(settlements)
+
+    def load(self, settlements):
+        """(Re)build the settlement index and the static per-settlement arrays."""
+        self.settlements = list(settlements)
+        stores = {id(s.inventory.store): s.inventory.store for s in self.settlements}
+        if len(stores) > 1:
+            raise ValueError("BatchPricingEngine needs settlements that share one InventoryStore")
+        self.store = next(iter(stores.values()), None)
+        self.row_of = {settlement.id: index for index, settlement in enumerate(self.settlements)}
+        self.store_rows = np.array([s.inventory.row for s in self.settlements], dtype=np.intp)
+
+        types = [s.settlement_type for s in self.settlements]
+        self.type_modifiers = np.array(
+            [PricingHandler.SETTLEMENT_TYPE_MODIFIERS.get(t, 1.0) for t in types])[:, None]
+        self.base_demand = np.array(
+            [PricingHandler.BASE_DEMAND.get(t, 1.0) for t in types])[:, None]
+
+    def update_prices(self, settlements=None):
+        """
+        Reprice the given settlements (all loaded settlements by default).
+
+        Prices are read from and written back to the settlements' inventory store.
+
+        Returns:
+            The applied PriceSnapshot, or None if there was nothing to price
+        """
+        job = self.snapshot(settlements)
+        if job is None:
+            return None
+        snapshot = self.compute(job, self.rng)
+        self.apply(snapshot)
+        return snapshot
+
+    def snapshot(self, settlements=None):
+        """
+        Capture what a price pass over the given settlements needs.
+
+        Must run on the thread that owns the settlements. Returns None if
+        there is nothing to price.
+        """
+        if settlements is None:
+            settlements = self.settlements
+        indexes = np.array([self.row_of[s.id] for s in settlements], dtype=np.intp)
+        if not len(indexes):
+            return None
+        store = self.store
+        store_rows = self.store_rows[indexes]
+        # Gather held items by index; copying whole (rows x catalog) blocks and masking them is far slower
+        entry_rows, entry_cols = np.nonzero(store.present[store_rows])
+        entry_store_rows = store_rows[entry_rows]
+        return PricingJob(
+            sequence=next(self._sequence),
+            settlement_ids=tuple(s.id for s in settlements),
+            stock_versions=tuple(s.stock_version for s in settlements),
+            store_rows=_frozen(store_rows),
+            entry_rows=_frozen(entry_rows),
+            entry_cols=_frozen(entry_cols),
+            entry_item_ids=_frozen(np.asarray(store.item_ids, dtype=np.int64)[entry_cols]),
+            base_prices=_frozen(store.buy_prices[entry_store_rows, entry_cols].astype(np.int64)),
+            quantities=_frozen(store.quantities[entry_store_rows, entry_cols].astype(np.int64)),
+            base_demand=_frozen(self.base_demand[indexes, 0][entry_rows]),
+            type_modifiers=_frozen(self.type_modifiers[indexes, 0][entry_rows]),
+        )
+
+    def discard_pending(self):
+        """Drop every pass snapshotted so far, e.g. after prices were restored from a save."""
+        self.min_sequence = next(self._sequence)
+
+    @classmethod
+    def compute(cls, job, rng):
+        """Run a price pass over a snapshot. Touches no game state, so it is safe off the main thread."""
+        counts = np.bincount(job.entry_rows, minlength=len(job.settlement_ids))
+        buy, sell = cls.compute_prices(job.base_prices, job.quantities,
+                                       job.base_demand, job.type_modifiers, rng, counts)
+        return PriceSnapshot(job, _frozen(buy), _frozen(sell))
+
+    def apply(self, snapshot):
+        """
+        Write a computed snapshot's prices into the inventory store.
+
+        Only prices are written; stock and gold stay whatever the main thread
+        made of them in the meantime. Settlements already repriced by a newer
+        pass are skipped, and items sold out since the snapshot are ignored.
+
+        Returns:
+            Settlements whose stock changed since the snapshot was taken, so
+            their new prices are based on old stock and they need repricing;
+            None if the whole pass was discarded (see discard_pending)
+        """
+        job = snapshot.job
+        if job.sequence < self.min_sequence:
+            return None
+        stale = []
+        current = np.zeros(len(job.settlement_ids), dtype=bool)
+        for index, (settlement_id, stock_version) in enumerate(zip(job.settlement_ids, job.stock_versions)):
+            row = self.row_of.get(settlement_id)
+            if row is None or self.last_priced.get(settlement_id, -1) > job.sequence:
+                continue
+            self.last_priced[settlement_id] = job.sequence
+            current[index] = True
+            settlement = self.settlements[row]
+            if settlement.stock_version != stock_version:
+                stale.append(settlement)
+
+        keep = current[job.entry_rows]
+        rows = job.store_rows[job.entry_rows[keep]]
+        cols = job.entry_cols[keep]
+        still_held = self.store.present[rows, cols]
+        self.store.set_prices(rows[still_held], cols[still_held],
+                              snapshot.buy_prices[keep][still_held], snapshot.sell_prices[keep][still_held])
+        return stale
+
+    @classmethod
+    def compute_prices(cls, base_prices, quantities, base_demand, type_modifiers, rng, counts=None):
+        """
+        Compute new buy and sell prices for equally sized arrays of items.
+
+        Draws and arithmetic follow PricingHandler.update_settlement_prices
+        step for step, so from the same generator state the settlements get
+        exactly the prices the scalar path would give them one after another.
+
+        Args:
+            base_prices: Current buy prices, used as the base for the new ones
+            quantities: Current stock levels
+            base_demand: Demand level of each item's settlement type
+            type_modifiers: Settlement type price modifier of each item
+            rng: numpy Generator for demand variation and price fluctuation
+            counts: Number of items of each settlement, whose items come one
+                settlement after another (default: all items are one settlement's)
+
+        Returns:
+            Tuple of (buy_prices, sell_prices) as int64 arrays
+        """
+        if counts is None:
+            counts = [len(base_prices)]
+        demand_variation, buy_fluctuation, sell_fluctuation = \
+            PricingHandler.draw_variations(rng, counts)
+        demand_modifier = (base_demand * demand_variation) ** 1.5
+
+        levels = PricingHandler.STOCK_LEVELS
+        modifiers = PricingHandler.STOCK_MODIFIERS
+        stock_modifier = np.select(
+            [quantities <= levels["scarce"], quantities <= levels["low"], quantities <= levels["normal"]],
+            [modifiers["scarce"], modifiers["low"], modifiers["normal"]],
+            default=modifiers["abundant"]
+        )
+
+        buy = base_prices * type_modifiers * stock_modifier * demand_modifier * buy_fluctuation
+        buy = np.minimum(np.maximum(1, np.rint(buy)), PRICE_MAX).astype(np.int64)
+        # Settlements buy at 70% of the calculated price, based on the new buy price
+        sell = buy * type_modifiers * stock_modifier * demand_modifier * 0.7 * sell_fluctuation
+        sell = np.maximum(1, np.rint(sell)).astype(np.int64)
+        return buy, sell
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def sequence_state(sequence):
+    """A SeedSequence, including how many children it has spawned, as plain data."""
+    return {"entropy": sequence.entropy, "spawn_key": list(sequence.spawn_key),
+            "spawned": sequence.n_children_spawned}
+
+def sequence_from_state(state):
+    """Rebuild a SeedSequence saved with sequence_state()."""
+    return np.random.SeedSequence(state["entropy"], spawn_key=tuple(state["spawn_key"]),
+                                  n_children_spawned=state["spawned"])
+
+class EconomyWorker:
+    """
+    Runs price passes on a background thread.
+
+    submit() snapshots the settlements on the calling (main) thread and queues
+    the immutable snapshot; the worker computes new prices from it without
+    touching game state. collect() applies finished snapshots back on the main
+    thread, one whole pass at a time, so drawing and trading only ever see
+    complete price sets and the main loop never waits on the economy.
+
+    numpy Generators are not thread safe, so each pass draws from its own
+    generator, seeded from the "economy_worker" stream at submit() time on
+    the main thread. A pass's draws therefore depend only on how many passes
+    were submitted before it, not on when the worker gets to it, so the
+    stream's seed and that count (get_state) are all a save or a journal
+    replay needs to reproduce them.
+    """
+
+    def __init__(self, pricing_engine, rng_streams):
+        self.pricing_engine = pricing_engine
+        self.sequence = rng_streams.sequence("economy_worker")  # Spawns one child seed per pass
+        self.in_flight = 0
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._work_loop, name="economy-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, settlements):
+        """Queue a price pass over the given settlements and return its PricingJob (None if empty)."""
+        job = self.pricing_engine.snapshot(settlements)
+        if job is not None:
+            self.in_flight += 1
+            self._jobs.put((job, self.sequence.spawn(1)[0]))
+        return job
+
+    def get_state(self):
+        """The pass seed sequence and the number of passes submitted so far, as plain data."""
+        return sequence_state(self.sequence)
+
+    def set_state(self, state):
+        """Continue seeding passes where get_state() left off, e.g. after loading a save."""
+        self.sequence = sequence_from_state(state)
+
+    def collect(self):
+        """
+        Apply every finished price pass without blocking.
+
+        Returns:
+            List of (applied PriceSnapshot, settlements whose stock changed while it was running)
+        """
+        applied = []
+        while True:
+            try:
+                snapshot = self._results.get_nowait()
+            except queue.Empty:
+                return applied
+            self.in_flight -= 1
+            if snapshot is None:
+                continue
+            stale = self.pricing_engine.apply(snapshot)
+            if stale is not None:
+                applied.append((snapshot, stale))
+
+    def close(self):
+        """Stop the worker thread, dropping passes that have not been collected."""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _work_loop(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            job, seed = item
+            try:
+                self._results.put(self.pricing_engine.compute(job, np.random.default_rng(seed)))
+            except Exception:
+                logger.exception("Price pass %s failed", job.sequence)
+                self._results.put(None)
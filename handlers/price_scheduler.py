@@ -0,0 +1,128 @@
+import heapq
+
+class PriceScheduler:
+    """
+    Decides which settlements get repriced on each tick.
+
+    A settlement is repriced when its stock changed since its last pricing
+    (it is dirty) or when its periodic price drift is due. Everything else is
+    left alone, so an economy tick costs O(changed) rather than O(settlements).
+
+    With an EconomyWorker, batches are handed to the worker and their prices
+    land on a later tick; settlements traded with in the meantime are marked
+    dirty again once their pass comes back. With a RegionalEconomy, drift is
+    a whole-world economy step every drift_interval ticks instead, submitted
+    and collected the same way.
+    """
+
+    def __init__(self, pricing_engine, settlements, drift_interval=100, worker=None, journal=None, economy=None):
+        self.pricing_engine = pricing_engine
+        self.worker = worker  # Optional EconomyWorker for off-thread price passes
+        self.economy = economy  # Optional RegionalEconomy that drifts every settlement at once
+        self._economy_due = False  # An economy step came due while the previous one was running
+        self.journal = journal  # Optional EventJournal; every pass is recorded as a submit and an apply
+        self.drift_interval = drift_interval  # Ticks between drift repricings of a settlement, None to disable
+        self.dirty = {}  # settlement id -> settlement with changed stock
+        self._due_heap = []  # (due tick, settlement id), may hold stale entries
+        self._due_tick = {}  # settlement id -> current due tick
+        self._settlements = {}
+        self.watch(settlements)
+
+    def watch(self, settlements, game_tick=0):
+        """Start tracking settlements; their first drift is due one interval from now."""
+        for settlement in settlements:
+            settlement.price_scheduler = self
+            self._settlements[settlement.id] = settlement
+            self._schedule_drift(settlement.id, game_tick)
+
+    def mark_dirty(self, settlement):
+        """Queue a settlement for repricing on the next update."""
+        self.dirty[settlement.id] = settlement
+
+    def is_stale(self, settlement, game_tick):
+        """True if the settlement is dirty or its drift is due."""
+        if settlement.id in self.dirty:
+            return True
+        if self.economy:
+            return False
+        return self.drift_interval is not None and self._due_tick.get(settlement.id, game_tick) <= game_tick
+
+    def update(self, game_tick):
+        """
+        Reprice all dirty settlements and those whose drift is due.
+
+        Returns:
+            Number of settlements repriced
+        """
+        if self.worker:
+            for snapshot, stale in self.worker.collect():
+                self._record_apply(snapshot)
+                for settlement in stale:
+                    self.mark_dirty(settlement)
+        if self.economy:
+            self._update_economy(game_tick)
+        batch = dict(self.dirty)
+        self.dirty.clear()
+        while self._due_heap and self._due_heap[0][0] <= game_tick:
+            due_tick, settlement_id = heapq.heappop(self._due_heap)
+            if self._due_tick.get(settlement_id) == due_tick:
+                batch[settlement_id] = self._settlements[settlement_id]
+        if batch:
+            self._reprice(list(batch.values()), game_tick)
+        return len(batch)
+
+    def recompute_now(self, settlement, game_tick):
+        """Reprice a single settlement immediately, e.g. the one being traded with."""
+        self.dirty.pop(settlement.id, None)
+        self._reprice([settlement], game_tick, wait=True)
+
+    def _reprice(self, settlements, game_tick, wait=False):
+        if self.worker and not wait:
+            job = self.worker.submit(settlements)
+            self._record_submit(job, worker=True)
+        else:
+            snapshot = self.pricing_engine.update_prices(settlements)
+            if snapshot is not None:
+                self._record_submit(snapshot.job)
+                self._record_apply(snapshot)
+        for settlement in settlements:
+            self._schedule_drift(settlement.id, game_tick)
+
+    def _update_economy(self, game_tick):
+        """
+        Start the next economy step when it is due and apply a finished one.
+
+        With a worker the step is priced in the background and lands on a
+        later tick; without one (headless runs) it is priced inline, like any
+        other pass.
+        """
+        if self.drift_interval is not None and game_tick % self.drift_interval == 0:
+            self._economy_due = True
+        if self._economy_due and not self.economy.busy:
+            self._economy_due = False
+            step = self.economy.submit(background=self.worker is not None)
+            if self.journal:
+                self.journal.record("economy_submit", step=step)
+        finished = self.economy.collect(wait=self.worker is None)
+        if finished is not None:
+            step, stale = finished
+            if self.journal:
+                self.journal.record("economy_apply", step=step)
+            for settlement in stale:
+                self.mark_dirty(settlement)
+
+    def _record_submit(self, job, worker=False):
+        if self.journal and job is not None:
+            self.journal.record("price_submit", sequence=job.sequence, settlements=list(job.settlement_ids),
+                                worker=worker)
+
+    def _record_apply(self, snapshot):
+        if self.journal:
+            self.journal.record("price_apply", sequence=snapshot.job.sequence)
+
+    def _schedule_drift(self, settlement_id, game_tick):
+        if self.drift_interval is None or self.economy:
+            return  # No drift, or the economy drifts every settlement at once
+        due_tick = game_tick + self.drift_interval
+        self._due_tick[settlement_id] = due_tick
+        heapq.heappush(self._due_heap, (due_tick, settlement_id))
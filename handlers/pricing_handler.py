@@ -1,6 +1,10 @@
+import logging
 import math
-import random
 from typing import Dict
+import numpy as np
+from rng_streams import RngStreams
+
+logger = logging.getLogger(__name__)
 
 class PricingHandler:
     # Price modifiers based on settlement type
@@ -11,6 +15,14 @@ class PricingHandler:
         "village": 0.8     # Villages have lower prices
     }
 
+    # Base demand level for each settlement type
+    BASE_DEMAND = {
+        "capital": 1.2,
+        "castle": 1.3,
+        "town": 1.0,
+        "village": 0.8
+    }
+
     # Stock level thresholds
     STOCK_LEVELS = {
         "scarce": 5,       # 0-5 units
@@ -27,9 +39,41 @@ class PricingHandler:
         "abundant": 0.8    # High stock = lower prices
     }
 
+    @classmethod
+    def draw_variations(cls, rng, counts):
+        """
+        Draw the random inputs of a price pass over several settlements.
+
+        Each settlement draws a block of its own: demand variations for all
+        of its items, then buy fluctuations, then sell fluctuations. A batch
+        over many settlements therefore draws exactly the numbers that
+        repricing them one at a time, in the same order, would draw from the
+        same generator state. Regional economy steps draw per region from
+        a stream of their own and do not reproduce these numbers (see
+        RegionalEconomy).
+
+        Args:
+            rng: numpy Generator to draw from
+            counts: Number of items of each settlement, in pass order
+
+        Returns:
+            Tuple of (demand variation, buy fluctuation, sell fluctuation)
+            arrays, one entry per item, settlement by settlement
+        """
+        counts = np.asarray(counts, dtype=np.intp)
+        starts = np.cumsum(counts) - counts  # First item of each settlement
+        uniform = rng.random(3 * int(counts.sum()))
+        # Item i of a settlement whose items start at s is at 3*s + i in the draws
+        positions = np.arange(len(uniform) // 3) + 2 * np.repeat(starts, counts)
+        sizes = np.repeat(counts, counts)
+        # Same arithmetic as Generator.uniform, so a single settlement's block matches uniform() draws
+        return (0.8 + (1.2 - 0.8) * uniform[positions],
+                0.95 + (1.05 - 0.95) * uniform[positions + sizes],
+                0.95 + (1.05 - 0.95) * uniform[positions + 2 * sizes])
+
     @classmethod
     def calculate_price(cls, base_price: int, quantity: int, demand: float, 
-                       settlement_type: str, is_buying: bool = True) -> int:
+                       settlement_type: str, is_buying: bool = True, fluctuation: float = None) -> int:
         """
         Calculate the final price for an item based on various factors.
         
@@ -39,6 +83,7 @@ class PricingHandler:
             demand: Demand level (0.0 to 2.0, where 1.0 is normal)
             settlement_type: Type of settlement
             is_buying: True if buying from settlement, False if selling to settlement
+            fluctuation: Random price factor (0.95 to 1.05); drawn from the pricing stream if None
         
         Returns:
             Final calculated price
@@ -60,7 +105,8 @@ class PricingHandler:
             price *= 0.7  # Settlements buy at 70% of calculated price
 
         # 5. Apply small random fluctuation (±5%)
-        fluctuation = random.uniform(0.95, 1.05)
+        if fluctuation is None:
+            fluctuation = RngStreams.shared().get("pricing").uniform(0.95, 1.05)
         price *= fluctuation
 
         # Ensure minimum price of 1
@@ -85,24 +131,28 @@ class PricingHandler:
         return math.pow(demand, 1.5)  # Using power of 1.5 for more pronounced effect
 
     @classmethod
-    def update_settlement_prices(cls, settlement) -> None:
+    def update_settlement_prices(cls, settlement, rng=None) -> None:
         """
         Update all item prices in a settlement based on current conditions.
+
+        Args:
+            settlement: Settlement to reprice
+            rng: numpy Generator to draw from (default: the shared pricing stream)
         """
-        print(f"Updating prices for settlement: {settlement.name}")
+        logger.debug("Updating prices for settlement: %s", settlement.name)
+        if rng is None:
+            rng = RngStreams.shared().get("pricing")
         
         # Calculate base demand for the settlement type
-        base_demand = {
-            "capital": 1.2,
-            "castle": 1.3,
-            "town": 1.0,
-            "village": 0.8
-        }.get(settlement.settlement_type, 1.0)
+        base_demand = cls.BASE_DEMAND.get(settlement.settlement_type, 1.0)
 
         # Update prices for each item in settlement's inventory
-        for item_id, item in settlement.inventory.items():
+        items = settlement.inventory.items()
+        demand_variations, buy_fluctuations, sell_fluctuations = cls.draw_variations(rng, [len(items)])
+        for (item_id, item), variation, buy_fluctuation, sell_fluctuation in zip(
+                items, demand_variations.tolist(), buy_fluctuations.tolist(), sell_fluctuations.tolist()):
             # Calculate unique demand for this item (base demand + random variation)
-            item_demand = base_demand * random.uniform(0.8, 1.2)
+            item_demand = base_demand * variation
             
             # Update buy price (when player buys from settlement)
             item.buy_price = cls.calculate_price(
@@ -110,7 +160,8 @@ class PricingHandler:
                 quantity=item.quantity,
                 demand=item_demand,
                 settlement_type=settlement.settlement_type,
-                is_buying=True
+                is_buying=True,
+                fluctuation=buy_fluctuation
             )
 
             # Update sell price (when player sells to settlement)
@@ -119,7 +170,8 @@ class PricingHandler:
                 quantity=item.quantity,
                 demand=item_demand,
                 settlement_type=settlement.settlement_type,
-                is_buying=False
+                is_buying=False,
+                fluctuation=sell_fluctuation
             )
 
     @classmethod
@@ -128,12 +180,7 @@ class PricingHandler:
         Get detailed breakdown of price factors for an item in a settlement.
         Useful for debugging and UI tooltips.
         """
-        base_demand = {
-            "capital": 1.2,
-            "castle": 1.3,
-            "town": 1.0,
-            "village": 0.8
-        }.get(settlement.settlement_type, 1.0)
+        base_demand = cls.BASE_DEMAND.get(settlement.settlement_type, 1.0)
 
         return {
             "base_price": item.buy_price,
@@ -0,0 +1,225 @@
+import dataclasses
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from handlers.batch_pricing import BatchPricingEngine
+from models.spatial_index import SpatialGrid
+from rng_streams import RngStreams
+
+logger = logging.getLogger(__name__)
+
+CROWN_REGION = 0  # The castle and anything outside a kingdom
+
+def assign_regions(settlements):
+    """
+    Split settlements into kingdoms.
+
+    Every settlement belongs to the kingdom of its nearest capital; castles
+    form the crown region of their own. Kingdoms are numbered from 1 in
+    capital id order so the numbering is the same on every run.
+
+    Returns:
+        Dict of settlement id -> region number
+    """
+    capitals = sorted((s for s in settlements if s.settlement_type == "capital"), key=lambda s: s.id)
+    region_of_capital = {capital.id: region for region, capital in enumerate(capitals, start=1)}
+    capital_index = SpatialGrid(capitals, cell_size=1000)
+    regions = {}
+    for settlement in settlements:
+        nearest = capital_index.nearest(settlement.x, settlement.y) if settlement.settlement_type != "castle" else []
+        regions[settlement.id] = region_of_capital[nearest[0].id] if nearest else CROWN_REGION
+    return regions
+
+def price_region(job, seed_sequence, index_item_ids=None, index_prices=None, coupling=0.0):
+    """
+    Run one region's price pass. Touches no game state, so it is safe off the main thread.
+
+    The RNG is seeded from the region's own shard of the step (see
+    RegionalEconomy.shard_sequence), so a region's prices depend only on
+    its own snapshot and the last synced index, never on which thread ran
+    it or in what order.
+
+    Args:
+        job: PricingJob for the region's settlements
+        seed_sequence: numpy SeedSequence of the region's shard of the step
+        index_item_ids: Sorted item ids of the cross-region price index
+        index_prices: Mean buy price of each item in the other regions (NaN if unknown)
+        coupling: Fraction of the way base prices are pulled towards the index
+
+    Returns:
+        PriceSnapshot for the region
+    """
+    rng = np.random.default_rng(seed_sequence)
+    if coupling and index_prices is not None and len(index_item_ids):
+        positions = np.minimum(np.searchsorted(index_item_ids, job.entry_item_ids), len(index_item_ids) - 1)
+        reference = np.where(index_item_ids[positions] == job.entry_item_ids, index_prices[positions], np.nan)
+        known = ~np.isnan(reference)
+        base_prices = job.base_prices.astype(float)
+        base_prices[known] += coupling * (reference[known] - base_prices[known])
+        job = dataclasses.replace(job, base_prices=base_prices)
+    return BatchPricingEngine.compute(job, rng)
+
+class RegionalEconomy:
+    """
+    Steps the whole economy one kingdom per shard.
+
+    submit() snapshots every region on the main thread and prices the
+    regions on a background thread (or inline); collect() applies a step
+    once every region is priced, in region order, so the main loop never
+    waits on the pricing. Regions only see each other through a per-item
+    price index exchanged every sync_interval steps, so background and
+    inline runs with the same seed produce identical prices.
+
+    Regional steps are a determinism domain of their own. Each region's
+    shard of a step draws from a SeedSequence keyed by the region and the
+    step, under the "regional_economy" stream, and never from the pricing
+    generator. A run therefore reproduces another regional run with the
+    same seed and the same kingdoms, but not the prices a scalar or batch
+    pass over the same settlements would give.
+    """
+
+    def __init__(self, pricing_engine, settlements, rng_streams=None, sync_interval=10, coupling=0.05):
+        self.pricing_engine = pricing_engine
+        # Shards of every step are keyed off this stream; see shard_sequence
+        self.sequence = (rng_streams or RngStreams.shared()).sequence("regional_economy")
+        self.sync_interval = sync_interval  # Steps between price index exchanges
+        self.coupling = coupling  # How strongly prices drift towards other regions' prices
+        self.step_count = 0
+        self.region_of = assign_regions(settlements)
+        self.regions = {}  # region -> [settlement]
+        for settlement in settlements:
+            self.regions.setdefault(self.region_of[settlement.id], []).append(settlement)
+        self.index_item_ids = np.zeros(0, dtype=np.int64)
+        self.foreign_prices = {}  # region -> mean buy price per index item in the other regions
+        self._executor = None  # Background thread the regions are priced on, started on first use
+        self._pending = None  # (step, regions, future) of the step being priced
+        logger.info("Regional economy: %s regions", len(self.regions))
+
+    @property
+    def busy(self):
+        """True while a submitted step has not been collected."""
+        return self._pending is not None
+
+    def submit(self, background=True):
+        """
+        Snapshot every region and start pricing the next step.
+
+        Returns:
+            The step number; its prices are applied by a later collect()
+
+        Raises:
+            RuntimeError: If the previous step has not been collected yet
+        """
+        if self._pending is not None:
+            raise RuntimeError(f"Economy step {self._pending[0]} is still being priced")
+        step = self.step_count
+        jobs, regions = [], []
+        for region in sorted(self.regions):
+            job = self.pricing_engine.snapshot(self.regions[region])
+            if job is not None:
+                jobs.append((job, self.shard_sequence(region, step), self.index_item_ids,
+                             self.foreign_prices.get(region), self.coupling))
+                regions.append(region)
+
+        if background:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="regional-economy")
+            future = self._executor.submit(self._price_regions, jobs)
+        else:
+            future = Future()
+            future.set_result(self._price_regions(jobs))
+        self._pending = (step, regions, future)
+        return step
+
+    def collect(self, wait=False):
+        """
+        Apply the submitted step once every region has been priced.
+
+        Args:
+            wait: Block until the step is finished instead of returning None
+
+        Returns:
+            Tuple of (step number, settlements whose stock changed while their
+            region was being priced), or None if no step is ready
+        """
+        if self._pending is None:
+            return None
+        step, regions, future = self._pending
+        if not wait and not future.done():
+            return None
+        snapshots = future.result()
+        self._pending = None
+
+        stale = []
+        for snapshot in snapshots:
+            stale.extend(self.pricing_engine.apply(snapshot) or ())
+        self.step_count += 1
+        if self.step_count % self.sync_interval == 0:
+            self.sync(regions, snapshots)
+        return step, stale
+
+    def step(self, background=True):
+        """
+        Reprice every settlement once and wait for the result.
+
+        Returns:
+            Settlements whose stock changed while their region was being priced
+        """
+        self.submit(background)
+        return self.collect(wait=True)[1]
+
+    def discard_pending(self):
+        """Forget a step still being priced, e.g. after a save was restored over its input."""
+        self._pending = None
+
+    def sync(self, regions, snapshots):
+        """Rebuild the cross-region price index from the regions' latest prices."""
+        item_ids = np.unique(np.concatenate([s.job.entry_item_ids for s in snapshots])) \
+            if snapshots else np.zeros(0, dtype=np.int64)
+        sums = np.zeros((len(snapshots), len(item_ids)))
+        counts = np.zeros((len(snapshots), len(item_ids)))
+        for i, snapshot in enumerate(snapshots):
+            columns = np.searchsorted(item_ids, snapshot.job.entry_item_ids)
+            sums[i] = np.bincount(columns, weights=snapshot.buy_prices, minlength=len(item_ids))
+            counts[i] = np.bincount(columns, minlength=len(item_ids))
+        total_sums, total_counts = sums.sum(axis=0), counts.sum(axis=0)
+        self.index_item_ids = item_ids
+        self.foreign_prices = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for i, region in enumerate(regions):
+                other_counts = total_counts - counts[i]
+                self.foreign_prices[region] = np.where(
+                    other_counts > 0, (total_sums - sums[i]) / other_counts, np.nan)
+
+    def shard_sequence(self, region, step):
+        """The SeedSequence a region's shard of an economy step draws from."""
+        return np.random.SeedSequence(self.sequence.entropy, spawn_key=self.sequence.spawn_key + (region, step))
+
+    def get_state(self):
+        """Seed, step counter and price index as plain data, so a run can be resumed from it."""
+        return {
+            "sequence": {"entropy": self.sequence.entropy, "spawn_key": list(self.sequence.spawn_key)},
+            "step_count": self.step_count,
+            "index_item_ids": self.index_item_ids.tolist(),
+            "foreign_prices": {str(region): prices.tolist() for region, prices in self.foreign_prices.items()},
+        }
+
+    def set_state(self, state):
+        self._pending = None  # A step in flight was priced from the state being replaced
+        self.sequence = np.random.SeedSequence(state["sequence"]["entropy"],
+                                               spawn_key=tuple(state["sequence"]["spawn_key"]))
+        self.step_count = state["step_count"]
+        self.index_item_ids = np.array(state["index_item_ids"], dtype=np.int64)
+        self.foreign_prices = {int(region): np.array(prices, dtype=float)
+                               for region, prices in state["foreign_prices"].items()}
+
+    def close(self):
+        """Stop the background thread once the step it is pricing is done."""
+        self._pending = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _price_regions(jobs):
+        return [price_region(*args) for args in jobs]
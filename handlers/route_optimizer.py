@@ -0,0 +1,344 @@
+import heapq
+import logging
+from dataclasses import dataclass
+import numpy as np
+from models.pathfinding import RoutePlanner
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class TradeRun:
+    """A suggested trip: buy cargo at one settlement and sell it at another."""
+    origin_id: int
+    destination_id: int
+    cargo: tuple  # (item id, quantity) pairs, most profitable first
+    cost: int  # Gold paid at the origin
+    profit: int  # Gold made selling at the destination, after the cost
+    travel_time: float  # Base-speed pixels, see RoutePlanner.travel_time
+
+    @property
+    def profit_rate(self):
+        """Profit per pixel travelled."""
+        return self.profit / self.travel_time if self.travel_time > 0 else float(self.profit)
+
+@dataclass(frozen=True)
+class TradeLoop:
+    """A round trip between two settlements, trading on the way out and back."""
+    outbound: TradeRun
+    inbound: TradeRun  # None if nothing is worth carrying back
+
+    @property
+    def profit(self):
+        return self.outbound.profit + (self.inbound.profit if self.inbound else 0)
+
+    @property
+    def travel_time(self):
+        return self.outbound.travel_time * 2
+
+    @property
+    def profit_rate(self):
+        return self.profit / self.travel_time if self.travel_time > 0 else float(self.profit)
+
+@dataclass(frozen=True)
+class _Legs:
+    """Profitable legs from one origin: its best items (by unit margin) per destination."""
+    destinations: np.ndarray  # Settlement indexes
+    distances: np.ndarray  # Straight-line distances
+    cols: np.ndarray  # (destinations x items_per_leg) store columns, best margin first
+    margins: np.ndarray  # Sale price of the cargo minus origin buy price, 0 if not profitable
+    buy_prices: np.ndarray  # Origin buy prices of those items
+    stock: np.ndarray  # Origin stock of those items
+
+class TradeRouteOptimizer:
+    """
+    Finds the most profitable trade runs and round trips between settlements.
+
+    Goods are valued at what a trade really pays: the origin's buy price
+    going in, and the cargo's own sell price coming out, which is the
+    catalog sell price the cargo was added with (see
+    TradeHandler.execute_order). Destinations within search_radius buy
+    whatever they are offered at that price, so every destination of an
+    origin shares its items_per_leg best margins and runs differ only in
+    travel time. Cargo is filled greedily by margin within the merchant's
+    free cart space and gold, for all destinations at once. Road travel
+    times are only looked up for the candidates that can still make the top
+    list, using straight-line distance at the fastest road speed as an
+    optimistic bound.
+
+    Legs are cached per origin. When a settlement's stock or prices change
+    (seen through InventoryStore.versions), its legs are dropped and rebuilt
+    on the next query. Each leg is planned with the merchant's current gold
+    and free cart space.
+    """
+
+    def __init__(self, settlements, route_planner, search_radius=1500, items_per_leg=8):
+        self.settlements = list(settlements)
+        stores = {id(s.inventory.store): s.inventory.store for s in self.settlements}
+        if len(stores) > 1:
+            raise ValueError("TradeRouteOptimizer needs settlements that share one InventoryStore")
+        self.store = next(iter(stores.values()), None)
+        self.route_planner = route_planner
+        self.search_radius = search_radius
+        self.items_per_leg = items_per_leg
+        self.index_of = {settlement.id: index for index, settlement in enumerate(self.settlements)}
+        self.store_rows = np.array([s.inventory.row for s in self.settlements], dtype=np.intp)
+        # What a sale pays per store column: cargo is added at its catalog sell price
+        self.sale_prices = np.array([item_type.sell_price for item_type in self.store.catalog.types]
+                                    if self.store is not None else [], dtype=np.int64)
+        self.max_speed = max(RoutePlanner.ROAD_SPEEDS.values())
+        self._xs = np.array([s.x for s in self.settlements], dtype=float)
+        self._ys = np.array([s.y for s in self.settlements], dtype=float)
+        self._neighbours = {}  # origin index -> (destination indexes, distances); positions never change
+        self._legs = {}  # origin index -> _Legs
+        self._fills = {}  # origin index -> (space, gold, profits, units)
+        self._travel_times = {}  # (lower index, higher index) -> travel time
+        self._loop_table = None  # Cached whole-map pair table for best_loops, see _pairs
+        self._loop_results = {}  # (origin index or None, space, gold, limit) -> loops
+        self._seen_versions = self._versions()
+        self.hits = 0
+        self.misses = 0
+
+    def best_trades(self, settlement, merchant, limit=5):
+        """
+        Most profitable runs starting at a settlement, best profit per distance first.
+
+        Returns:
+            List of up to limit TradeRun
+        """
+        self.refresh()
+        origin = self.index_of[settlement.id]
+        legs = self._legs_from(origin)
+        profits, units = self._fill(origin, merchant)
+        candidates = np.flatnonzero(profits > 0)
+        best = self._best_first(candidates, profits[candidates], legs.distances[candidates], limit,
+                                lambda j: self._travel_time(origin, int(legs.destinations[j])))
+        return [self._run(origin, legs, j, units[j], profits[j], travel_time) for _, j, travel_time in best]
+
+    def best_loops(self, merchant, limit=5, settlement=None):
+        """
+        Most profitable round trips, best profit per distance first.
+
+        Args:
+            merchant: Merchant whose free cart space and gold limit the cargo
+            limit: Number of loops to return
+            settlement: Only loops through this settlement; None searches the whole map
+
+        Returns:
+            List of up to limit TradeLoop
+        """
+        self.refresh()
+        origin = None if settlement is None else self.index_of[settlement.id]
+        key = (origin, max(0, merchant.cart_capacity - merchant.current_load), max(0, merchant.gold), limit)
+        loops = self._loop_results.get(key)
+        if loops is not None:
+            return loops
+        if origin is None:
+            origins, positions, destinations, values, distances = self._pairs(merchant)
+        else:
+            nearby = [origin] + self._neighbours_of(origin)[0].tolist()
+            table = self._pairs(merchant, nearby)
+            through = (table[0] == origin) | (table[2] == origin)
+            origins, positions, destinations, values, distances = (array[through] for array in table)
+        best = self._best_first(np.arange(len(values)), values, distances * 2, limit,
+                                lambda k: 2 * self._travel_time(int(origins[k]), int(destinations[k])))
+        loops = []
+        for _, k, travel_time in best:
+            origin, destination = int(origins[k]), int(destinations[k])
+            outbound = self._leg_run(origin, int(positions[k]), merchant, travel_time / 2)
+            reverse = np.flatnonzero(self._legs_from(destination).destinations == origin)
+            inbound = self._leg_run(destination, int(reverse[0]), merchant, travel_time / 2) if len(reverse) else None
+            if outbound is None:
+                outbound = TradeRun(self.settlements[origin].id, self.settlements[destination].id, (), 0, 0,
+                                    travel_time / 2)
+            loops.append(TradeLoop(outbound, inbound if inbound and inbound.profit > 0 else None))
+        self._loop_results[key] = loops
+        return loops
+
+    def refresh(self):
+        """
+        Drop cached legs touching settlements whose stock or prices changed.
+
+        Returns:
+            Number of changed settlements
+        """
+        versions = self._versions()
+        changed = np.flatnonzero(versions != self._seen_versions)
+        self._seen_versions = versions
+        if not len(changed):
+            return 0
+        self._loop_table = None
+        self._loop_results.clear()
+        if len(changed) * 8 >= len(self.settlements):
+            # A large part of the map changed (e.g. an economy step); dropping everything is cheaper
+            self._legs.clear()
+            self._fills.clear()
+            return len(changed)
+        for index in changed.tolist():
+            self._drop(index)  # Legs only depend on their origin's stock and prices
+        return len(changed)
+
+    def _versions(self):
+        return self.store.versions[self.store_rows] if self.store is not None else np.zeros(0, dtype=np.int64)
+
+    def _drop(self, origin):
+        self._legs.pop(origin, None)
+        self._fills.pop(origin, None)
+
+    def _neighbours_of(self, origin):
+        """Settlements within search_radius of an origin as (indexes, distances), closest first."""
+        neighbours = self._neighbours.get(origin)
+        if neighbours is None:
+            distances = np.hypot(self._xs - self._xs[origin], self._ys - self._ys[origin])
+            distances[origin] = np.inf
+            found = np.flatnonzero(distances <= self.search_radius)
+            found = found[np.argsort(distances[found], kind="stable")]
+            neighbours = self._neighbours[origin] = (found, distances[found])
+        return neighbours
+
+    def _legs_from(self, origin):
+        legs = self._legs.get(origin)
+        if legs is not None:
+            self.hits += 1
+            return legs
+        self.misses += 1
+        destinations, distances = self._neighbours_of(origin)
+        store = self.store
+        origin_row = self.store_rows[origin]
+        # Only items the origin has in stock can be bought there
+        items = np.flatnonzero(store.present[origin_row] & (store.quantities[origin_row] > 0))
+        buy_prices = store.buy_prices[origin_row, items].astype(np.int64)
+        stock = store.quantities[origin_row, items].astype(np.int64)
+
+        # Unit margins; a sale pays the same wherever it is made
+        margins = np.maximum(self.sale_prices[items] - buy_prices, 0)
+
+        # Keep the best items, best first, for every destination; none if nothing is profitable
+        k = min(self.items_per_leg, len(items))
+        if k < len(items):
+            local = np.argpartition(-margins, k - 1)[:k]
+            local = local[np.argsort(-margins[local], kind="stable")]
+        else:
+            local = np.argsort(-margins, kind="stable")
+        keep = np.full(len(destinations), k > 0 and margins[local[0]] > 0)
+        local = np.broadcast_to(local, (int(keep.sum()), k))
+        top = margins[local]
+        legs = _Legs(destinations[keep], distances[keep], items[local], top, buy_prices[local], stock[local])
+        self._legs[origin] = legs
+        return legs
+
+    def _fill(self, origin, merchant):
+        """Greedy cargo for every leg from an origin; returns (profits, units) arrays."""
+        space = max(0, merchant.cart_capacity - merchant.current_load)
+        gold = max(0, merchant.gold)
+        cached = self._fills.get(origin)
+        if cached is not None and cached[0] == space and cached[1] == gold:
+            return cached[2], cached[3]
+        legs = self._legs_from(origin)
+        count = len(legs.destinations)
+        units = np.zeros(legs.margins.shape, dtype=np.int64)
+        space_left = np.full(count, space, dtype=np.int64)
+        gold_left = np.full(count, gold, dtype=np.int64)
+        for j in range(legs.margins.shape[1]):
+            buy_prices = legs.buy_prices[:, j]
+            take = np.minimum(np.minimum(legs.stock[:, j], space_left), gold_left // np.maximum(buy_prices, 1))
+            take[legs.margins[:, j] <= 0] = 0
+            units[:, j] = take
+            space_left -= take
+            gold_left -= take * buy_prices
+        profits = (units * legs.margins).sum(axis=1)
+        self._fills[origin] = (space, gold, profits, units)
+        return profits, units
+
+    def _pairs(self, merchant, from_origins=None):
+        """
+        Profitable legs from the given origins (default: the whole map) with their round-trip value.
+
+        Returns:
+            Tuple of arrays (origins, leg positions, destinations, loop values, distances),
+            one entry per unordered settlement pair
+        """
+        space = max(0, merchant.cart_capacity - merchant.current_load)
+        key = (space, max(0, merchant.gold))
+        if from_origins is None:
+            if self._loop_table is not None and self._loop_table[0] == key:
+                return self._loop_table[1]
+            from_origins = range(len(self.settlements))
+        if not len(from_origins):
+            return (np.zeros(0, dtype=np.intp),) * 5
+        origins, positions, destinations, profits, distances = [], [], [], [], []
+        for origin in from_origins:
+            legs = self._legs_from(origin)
+            leg_profits = self._fill(origin, merchant)[0]
+            origins.append(np.full(len(leg_profits), origin, dtype=np.intp))
+            positions.append(np.arange(len(leg_profits)))
+            destinations.append(legs.destinations)
+            profits.append(leg_profits)
+            distances.append(legs.distances)
+        origins, positions, destinations, profits, distances = (
+            np.concatenate(parts) for parts in (origins, positions, destinations, profits, distances))
+
+        # Match every leg with its way back to value the round trip
+        count = len(self.settlements)
+        keys = origins.astype(np.int64) * count + destinations
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        reverse_keys = destinations.astype(np.int64) * count + origins
+        found = np.minimum(np.searchsorted(sorted_keys, reverse_keys), max(len(keys) - 1, 0))
+        has_reverse = sorted_keys[found] == reverse_keys if len(keys) else np.zeros(0, dtype=bool)
+        values = profits + np.where(has_reverse, profits[order][found] if len(keys) else 0, 0)
+        # Count each pair once, from the lower index when both directions are listed
+        unique = ~has_reverse | (origins < destinations)
+        table = tuple(array[unique] for array in (origins, positions, destinations, values, distances))
+        if len(from_origins) == len(self.settlements):
+            self._loop_table = (key, table)
+        return table
+
+    def _best_first(self, candidates, values, distances, limit, travel_time):
+        """
+        Top candidates by value per travel time, looking up as few travel times as possible.
+
+        Straight-line distance at the fastest road speed never overestimates
+        the rate, so candidates are visited in order of that bound and the
+        search stops once the bound falls below the current limit-th best.
+
+        Returns:
+            List of (rate, candidate, travel time), best first
+        """
+        if not len(candidates) or limit <= 0:
+            return []
+        bounds = values / np.maximum(distances / self.max_speed, 1e-9)
+        best = []  # Min-heap of (rate, candidate, travel time)
+        for position in np.argsort(-bounds, kind="stable").tolist():
+            if len(best) == limit and bounds[position] <= best[0][0]:
+                break
+            candidate = int(candidates[position])
+            time = travel_time(candidate)
+            rate = float(values[position]) / time if time > 0 else float(values[position])
+            entry = (rate, candidate, time)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        return sorted(best, reverse=True)
+
+    def _travel_time(self, a, b):
+        key = (a, b) if a < b else (b, a)
+        time = self._travel_times.get(key)
+        if time is None:
+            time = self.route_planner.travel_time(self.settlements[key[0]].id, self.settlements[key[1]].id)
+            self._travel_times[key] = time
+        return time
+
+    def _leg_run(self, origin, position, merchant, travel_time):
+        legs = self._legs_from(origin)
+        profits, units = self._fill(origin, merchant)
+        if profits[position] <= 0:
+            return None
+        return self._run(origin, legs, position, units[position], profits[position], travel_time)
+
+    def _run(self, origin, legs, position, units, profit, travel_time):
+        item_ids = self.store.item_ids[legs.cols[position]]
+        cargo = tuple((int(item_id), int(quantity)) for item_id, quantity in zip(item_ids, units) if quantity > 0)
+        cost = int((units * legs.buy_prices[position]).sum())
+        return TradeRun(self.settlements[origin].id, self.settlements[int(legs.destinations[position])].id,
+                        cargo, cost, int(profit), travel_time)
@@ -0,0 +1,191 @@
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+BUY = "buy"  # Merchant buys from the settlement
+SELL = "sell"  # Merchant sells to the settlement
+
+class OrderRejected(ValueError):
+    """An order could not be filled as a whole; nothing was traded."""
+
+@dataclass(frozen=True)
+class OrderLine:
+    """One line of an order basket."""
+    item_id: int
+    quantity: int
+    side: str = BUY
+
+@dataclass(frozen=True)
+class ReceiptLine:
+    """A filled order line at the price it traded at."""
+    item_id: int
+    name: str
+    side: str
+    quantity: int
+    unit_price: int
+
+    @property
+    def total(self):
+        return self.quantity * self.unit_price
+
+@dataclass(frozen=True)
+class TradeReceipt:
+    """Outcome of an executed order."""
+    settlement_id: int
+    lines: tuple
+    gold_paid: int  # Paid by the merchant for bought goods
+    gold_received: int  # Received by the merchant for sold goods
+    merchant_gold: int  # Merchant's gold after the trade
+
+    @property
+    def net_gold(self):
+        return self.gold_received - self.gold_paid
+
+class TradeHandler:
+    """
+    Executes trades between the merchant and a settlement.
+
+    Kept apart from TradingUI so trades can run headless (autopilot, NPC
+    traders, journal replays). Every trade is an order: a basket of
+    (item, quantity, side) lines checked as a whole and then applied in one
+    go, with one write-back record and one journal entry.
+    """
+
+    def __init__(self, persistence=None, journal=None):
+        self.persistence = persistence  # Optional WriteBehindPersistence for completed trades
+        self.journal = journal  # Optional EventJournal
+
+    def buy(self, merchant, settlement, item_id, quantity=1):
+        """
+        Buy units of an item from a settlement.
+
+        Returns:
+            True if the trade went through
+        """
+        return self._try_order(merchant, settlement, [OrderLine(item_id, quantity, BUY)]) is not None
+
+    def sell(self, merchant, settlement, item_id, quantity=1):
+        """
+        Sell units of an item from the merchant's cart to a settlement.
+
+        Returns:
+            True if the trade went through
+        """
+        return self._try_order(merchant, settlement, [OrderLine(item_id, quantity, SELL)]) is not None
+
+    def execute_order(self, merchant, settlement, lines):
+        """
+        Trade a basket of goods with a settlement, all of it or nothing.
+
+        Lines for the same item and side are merged; an item may not be both
+        bought and sold in one order. Stock, cart capacity and gold are checked
+        for the whole basket before anything changes (sales pay for purchases),
+        then every line is applied in O(1). Goods trade at the settlement's buy
+        price and the cart's sell price, exactly as the same trades made one
+        unit at a time would.
+
+        Args:
+            merchant: The trading Merchant
+            settlement: The Settlement traded with
+            lines: Iterable of OrderLine or (item_id, quantity, side) tuples
+
+        Returns:
+            TradeReceipt for the filled order
+
+        Raises:
+            OrderRejected: If any line cannot be filled; nothing is traded
+        """
+        buys, sells = self._merge_lines(lines)
+        stock = settlement.inventory
+        cargo = merchant.inventory
+
+        # Check the whole basket before touching any state
+        cost = 0
+        for item_id, quantity in buys.items():
+            entry = stock.get(item_id)
+            if entry is None or entry.quantity < quantity:
+                raise OrderRejected(f"{settlement.name} does not have {quantity} of item {item_id} in stock")
+            if not cargo.store.has_item(item_id):
+                raise OrderRejected(f"Item {item_id} is not in the merchant's item catalog")
+            cost += quantity * entry.buy_price
+        revenue = 0
+        for item_id, quantity in sells.items():
+            entry = cargo.get(item_id)
+            if entry is None or entry.quantity < quantity:
+                raise OrderRejected(f"Merchant does not have {quantity} of item {item_id}")
+            revenue += quantity * entry.sell_price
+        load = merchant.current_load + sum(buys.values()) - sum(sells.values())
+        if load > merchant.cart_capacity:
+            raise OrderRejected(f"Order needs {load} cart space, the cart holds {merchant.cart_capacity}")
+        if merchant.gold + revenue < cost:
+            raise OrderRejected(f"Order costs {cost - revenue} gold, the merchant has {merchant.gold}")
+
+        # Apply; settlement gold moves as with Settlement.add_item/remove_item plus the trade price
+        receipt_lines = []
+        for item_id, quantity in sells.items():
+            entry = cargo[item_id]
+            price = entry.sell_price
+            receipt_lines.append(ReceiptLine(item_id, entry.name, SELL, quantity, price))
+            entry.quantity -= quantity
+            if entry.quantity == 0:
+                del cargo[item_id]
+            held = stock.get(item_id)
+            if held is None:
+                held = stock.add(item_id, quantity)
+            else:
+                held.quantity += quantity
+            settlement.gold += quantity * held.buy_price - quantity * price
+        for item_id, quantity in buys.items():
+            entry = stock[item_id]
+            price = entry.buy_price
+            receipt_lines.append(ReceiptLine(item_id, entry.name, BUY, quantity, price))
+            settlement.gold += quantity * price - quantity * entry.sell_price
+            entry.quantity -= quantity
+            if entry.quantity <= 0:
+                del stock[item_id]
+            held = cargo.get(item_id)
+            if held is None:
+                cargo.add(item_id, quantity)
+            else:
+                held.quantity += quantity
+        merchant.current_load = load
+        merchant.gold += revenue - cost
+        settlement.mark_stock_changed()
+
+        receipt = TradeReceipt(settlement.id, tuple(receipt_lines), cost, revenue, merchant.gold)
+        logger.debug("Merchant traded %s line(s) with %s: paid %s, received %s gold",
+                     len(receipt_lines), settlement.name, cost, revenue)
+        if self.persistence:
+            self.persistence.record_trade(merchant, settlement, tuple(buys) + tuple(sells))
+        if self.journal:
+            self.journal.record("order", settlement=settlement.id,
+                                lines=[[line.item_id, line.quantity, line.side] for line in receipt_lines])
+        return receipt
+
+    def _try_order(self, merchant, settlement, lines):
+        try:
+            return self.execute_order(merchant, settlement, lines)
+        except OrderRejected as e:
+            logger.debug("Cannot trade: %s", e)
+            return None
+
+    @staticmethod
+    def _merge_lines(lines):
+        """Sum line quantities per item and side; returns ({item_id: quantity} bought, ... sold)."""
+        buys, sells = {}, {}
+        for line in lines:
+            if not isinstance(line, OrderLine):
+                line = OrderLine(*line)
+            if line.quantity <= 0:
+                raise OrderRejected(f"Quantity must be positive, got {line.quantity} of item {line.item_id}")
+            if line.side == BUY:
+                buys[line.item_id] = buys.get(line.item_id, 0) + line.quantity
+            elif line.side == SELL:
+                sells[line.item_id] = sells.get(line.item_id, 0) + line.quantity
+            else:
+                raise OrderRejected(f"Unknown order side {line.side!r}")
+        both = buys.keys() & sells.keys()
+        if both:
+            raise OrderRejected(f"Items {sorted(both)} are both bought and sold in one order")
+        return buys, sells
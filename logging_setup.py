@@ -0,0 +1,33 @@
+import logging
+import logging.handlers
+import queue
+from config import LOG_FILE, LOG_FORMAT, LOG_LEVELS
+
+def setup_logging(log_file=LOG_FILE, levels=LOG_LEVELS, console=True):
+    """
+    Route all logging through a queue so file and console I/O happen off the game thread.
+
+    The game thread only enqueues records; a QueueListener thread formats and
+    writes them. Levels are set per subsystem from config.LOG_LEVELS.
+
+    Returns:
+        The started QueueListener; call stop() on shutdown to flush pending records
+    """
+    log_queue = queue.SimpleQueue()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
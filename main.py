@@ -1,21 +1,44 @@
+import argparse
 import pygame
-import logging
+from logging_setup import setup_logging
 from game import Game
-from database.db_handler import DatabaseHandler
+from database.db_handler import DatabaseHandler, DEFAULT_DB_PATH
+import config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Medieval Merchant")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run the world simulation without opening a window")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="Number of ticks to simulate in headless mode (default: until interrupted)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH,
+                        help="World database to load, e.g. one made by generate_world.py")
+    parser.add_argument("--save-dir", default=config.SAVE_DIR,
+                        help="Directory for save game snapshots")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the latest save in --save-dir")
+    parser.add_argument("--regional-economy", action="store_true",
+                        help="Drift prices for the whole world one kingdom at a time, coupled by a price index")
+    parser.add_argument("--journal-dir", default=None,
+                        help="Record an event journal that replay.py can re-run in this directory (default: off)")
+    return parser.parse_args()
 
 def main():
-    pygame.init()
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,  # Change to logging.DEBUG for more detailed logs
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("game.log"),  # Logs will be saved to game.log
-            logging.StreamHandler()  # Logs will also be printed to the console
-        ]
-    )
-    game = Game()
-    game.run()
+    args = parse_args()
+    if not args.headless:
+        pygame.init()
+    # Configure logging; records are written by a background thread
+    log_listener = setup_logging()
+    try:
+        game = Game(headless=args.headless, db_path=args.db, regional_economy=args.regional_economy,
+                    save_dir=args.save_dir, resume=args.resume,
+                    journal_dir=args.journal_dir)
+        if args.headless:
+            game.run_headless(ticks=args.ticks)
+        else:
+            game.run()
+    finally:
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
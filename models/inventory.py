@@ -0,0 +1,204 @@
+import numpy as np
+
+# Prices and stock are stored as int32; computed prices are clamped to fit
+PRICE_MAX = np.iinfo(np.int32).max
+
+class InventoryStore:
+    """
+    Stock and prices of many inventories in contiguous arrays.
+
+    Each inventory (a settlement or merchant) owns a row and each ItemCatalog
+    position a column, so one world's stock is four (rows x items) arrays
+    instead of a dict of Item objects per settlement. Names, descriptions and
+    categories stay in the catalog. Inventory and InventoryEntry give the
+    rest of the game the dict-of-items view it is used to.
+    """
+
+    def __init__(self, catalog, rows=0):
+        self.catalog = catalog
+        self.column_of = catalog.position_of  # item id -> column
+        self.item_ids = catalog.item_ids
+        self.row_count = 0
+        self.quantities = np.zeros((max(rows, 1), len(catalog)), dtype=np.int32)
+        self.buy_prices = np.zeros_like(self.quantities)
+        self.sell_prices = np.zeros_like(self.quantities)
+        self.present = np.zeros(self.quantities.shape, dtype=bool)
+        self.dirty = np.zeros(self.quantities.shape[0], dtype=bool)  # Rows whose stock changed since the last snapshot
+        self.prices_dirty = np.zeros_like(self.dirty)  # Rows whose prices changed since the last snapshot
+        self.versions = np.zeros(self.quantities.shape[0], dtype=np.int64)  # Bumped on every change to a row
+        self.captures = []  # SnapshotCaptures still copying rows out of the store, see before_write
+
+    def has_item(self, item_id):
+        return item_id in self.column_of
+
+    def new_inventory(self):
+        """Allocate a row and return an empty Inventory on it."""
+        row = self.row_count
+        if row == self.quantities.shape[0]:
+            self._grow(row * 2)
+        self.row_count += 1
+        return Inventory(self, row)
+
+    def before_write(self, rows):
+        """Let snapshots that are still being copied take rows as they were before they change."""
+        for capture in tuple(self.captures):  # A capture detaches once it has every row
+            capture.copy_rows(rows)
+
+    def set_prices(self, rows, cols, buy_prices, sell_prices):
+        """Write computed prices for (row, col) pairs, clamped to the storage type."""
+        self.before_write(rows)
+        self.buy_prices[rows, cols] = np.minimum(buy_prices, PRICE_MAX)
+        self.sell_prices[rows, cols] = np.minimum(sell_prices, PRICE_MAX)
+        self.prices_dirty[rows] = True
+        self.versions[rows] += 1
+
+    def nbytes(self):
+        """Memory held by the stock and price arrays."""
+        return sum(a.nbytes for a in (self.quantities, self.buy_prices, self.sell_prices, self.present))
+
+    def _grow(self, rows):
+        for name in ("quantities", "buy_prices", "sell_prices", "present", "dirty", "prices_dirty", "versions"):
+            old = getattr(self, name)
+            new = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+class Inventory:
+    """
+    Dict-like view of one row of an InventoryStore: item id -> InventoryEntry.
+
+    Only items the row holds (present) are keys; iteration follows catalog order.
+    """
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def _columns(self):
+        return np.flatnonzero(self.store.present[self.row]).tolist()
+
+    def __len__(self):
+        return int(np.count_nonzero(self.store.present[self.row]))
+
+    def __iter__(self):
+        return iter(self.store.item_ids[self.store.present[self.row]].tolist())
+
+    def __contains__(self, item_id):
+        col = self.store.column_of.get(item_id)
+        return col is not None and bool(self.store.present[self.row, col])
+
+    def __getitem__(self, item_id):
+        col = self.store.column_of.get(item_id)
+        if col is None or not self.store.present[self.row, col]:
+            raise KeyError(item_id)
+        return InventoryEntry(self.store, self.row, col)
+
+    def __delitem__(self, item_id):
+        col = self.store.column_of.get(item_id)
+        if col is None or not self.store.present[self.row, col]:
+            raise KeyError(item_id)
+        self.store.before_write(self.row)
+        self.store.present[self.row, col] = False
+        self.store.quantities[self.row, col] = 0
+        self.store.dirty[self.row] = True
+        self.store.versions[self.row] += 1
+
+    def get(self, item_id, default=None):
+        col = self.store.column_of.get(item_id)
+        if col is None or not self.store.present[self.row, col]:
+            return default
+        return InventoryEntry(self.store, self.row, col)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [InventoryEntry(self.store, self.row, col) for col in self._columns()]
+
+    def items(self):
+        return [(entry.id, entry) for entry in self.values()]
+
+    def add(self, item_id, quantity, buy_price=None, sell_price=None):
+        """
+        Start holding a catalog item.
+
+        Prices default to the catalog prices. Returns the new entry.
+        """
+        store = self.store
+        col = store.column_of[item_id]
+        store.before_write(self.row)
+        store.present[self.row, col] = True
+        store.quantities[self.row, col] = quantity
+        item_type = store.catalog.types[col]
+        store.buy_prices[self.row, col] = item_type.buy_price if buy_price is None else buy_price
+        store.sell_prices[self.row, col] = item_type.sell_price if sell_price is None else sell_price
+        store.dirty[self.row] = True
+        store.versions[self.row] += 1
+        return InventoryEntry(store, self.row, col)
+
+class InventoryEntry:
+    """One item in an inventory; reads and writes go straight to the store's arrays."""
+    __slots__ = ("store", "row", "col")
+
+    def __init__(self, store, row, col):
+        self.store = store
+        self.row = row
+        self.col = col
+
+    @property
+    def item_type(self):
+        return self.store.catalog.types[self.col]
+
+    @property
+    def id(self):
+        return self.item_type.id
+
+    @property
+    def name(self):
+        return self.item_type.name
+
+    @property
+    def description(self):
+        return self.item_type.description
+
+    @property
+    def category(self):
+        return self.item_type.category
+
+    @property
+    def quantity(self):
+        return int(self.store.quantities[self.row, self.col])
+
+    @quantity.setter
+    def quantity(self, value):
+        self.store.before_write(self.row)
+        self.store.quantities[self.row, self.col] = value
+        self.store.dirty[self.row] = True
+        self.store.versions[self.row] += 1
+
+    @property
+    def buy_price(self):
+        return int(self.store.buy_prices[self.row, self.col])
+
+    @buy_price.setter
+    def buy_price(self, value):
+        self.store.before_write(self.row)
+        self.store.buy_prices[self.row, self.col] = min(value, PRICE_MAX)
+        self.store.prices_dirty[self.row] = True
+        self.store.versions[self.row] += 1
+
+    @property
+    def sell_price(self):
+        return int(self.store.sell_prices[self.row, self.col])
+
+    @sell_price.setter
+    def sell_price(self, value):
+        self.store.before_write(self.row)
+        self.store.sell_prices[self.row, self.col] = min(value, PRICE_MAX)
+        self.store.prices_dirty[self.row] = True
+        self.store.versions[self.row] += 1
+
+    def __repr__(self):
+        return (f"InventoryEntry(id={self.id}, name={self.name!r}, quantity={self.quantity}, "
+                f"buy_price={self.buy_price}, sell_price={self.sell_price})")
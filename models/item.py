@@ -1,6 +1,8 @@
 import logging
 from dataclasses import dataclass
-from database.db_handler import DatabaseHandler
+from models.item_catalog import ItemCatalog
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class Item:
@@ -12,47 +14,31 @@ class Item:
     category: str
     quantity: int = 0  # Ensure quantity is included
 
+    @classmethod
+    def from_type(cls, item_type, quantity=0):
+        """Make a standalone Item from an ItemCatalog entry."""
+        return cls(
+            id=item_type.id,
+            name=item_type.name,
+            buy_price=item_type.buy_price,
+            sell_price=item_type.sell_price,
+            description=item_type.description,
+            category=item_type.category,
+            quantity=quantity
+        )
+
     @staticmethod
-    def load_all_items():
-        logging.info("Loading all items...")
-        db = DatabaseHandler()
-        items_data = db.get_items()
-        items = []
-        for data in items_data:
-            item = Item(
-                id=data['id'],
-                name=data['name'],
-                buy_price=data['buy_price'],
-                sell_price=data['sell_price'],
-                description=data['description'],
-                category=data['category'],
-                quantity=0  # Set quantity to 0 as items table does not have 'quantity'
-            )
-            print(f"Loaded item: {item.name} (ID: {item.id}) x{item.quantity}")  # Retain quantities
-            logging.debug(f"Loaded item: {item.name} (ID: {item.id}) x{item.quantity}")
-        logging.info(f"Total items loaded: {len(items)}")
+    def load_all_items(db=None):
+        logger.debug("Loading all items...")
+        items = [Item.from_type(item_type) for item_type in ItemCatalog.shared(db).types]
+        logger.debug("Total items loaded: %s", len(items))
         return items
 
     @staticmethod
-    def get_item_by_id(item_id):
-        print(f"Retrieving item by ID: {item_id}")
-        logging.info(f"Retrieving item by ID: {item_id}")
-        db = DatabaseHandler()
-        data = db.get_item_by_id(item_id)
-        if data:
-            item = Item(
-                id=data['id'],
-                name=data['name'],
-                buy_price=data['buy_price'],
-                sell_price=data['sell_price'],
-                description=data['description'],
-                category=data['category'],
-                quantity=0  # Set quantity to 0 since get_item_by_id does not include 'quantity'
-            )
-            print(f"Item retrieved: {item.name} (ID: {item.id}) x{item.quantity}")  # Retain quantities
-            logging.debug(f"Item retrieved: {item.name} (ID: {item.id}) x{item.quantity}")
-            return item
-        print("Item not found.")
-        logging.warning("Item not found.")
+    def get_item_by_id(item_id, db=None):
+        # Served from the in-memory catalog; the database is only read once
+        item_type = ItemCatalog.shared(db).get(item_id)
+        if item_type:
+            return Item.from_type(item_type)
+        logger.warning("Item %s not found.", item_id)
         return None
-
@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+import numpy as np
+from database.db_handler import DatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class ItemType:
+    """Definition of one kind of good, shared by every inventory that holds it."""
+    id: int
+    name: str
+    description: str
+    category: str
+    buy_price: int  # Catalog prices, used when an inventory first stocks the item
+    sell_price: int
+
+class ItemCatalog:
+    """
+    Immutable list of every item type, loaded once per database.
+
+    Item types are indexed by id, by category and by catalog position; the
+    position is the column an item occupies in an InventoryStore.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, item_types):
+        self.types = tuple(item_types)
+        self.position_of = MappingProxyType({item.id: pos for pos, item in enumerate(self.types)})
+        self.by_id = MappingProxyType({item.id: item for item in self.types})
+        by_category = {}
+        for item in self.types:
+            by_category.setdefault(item.category, []).append(item)
+        self.by_category = MappingProxyType({category: tuple(items) for category, items in by_category.items()})
+        self.item_ids = np.array([item.id for item in self.types], dtype=np.int64)
+        self.item_ids.setflags(write=False)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a catalog from items table rows."""
+        return cls(ItemType(id=row['id'], name=row['name'], description=row['description'],
+                            category=row['category'], buy_price=row['buy_price'],
+                            sell_price=row['sell_price'])
+                   for row in rows)
+
+    @classmethod
+    def shared(cls, db=None):
+        """Return the catalog of a database, loading it on first use."""
+        db = db or DatabaseHandler.shared()
+        key = os.path.abspath(db.db_path)
+        with cls._instances_lock:
+            catalog = cls._instances.get(key)
+            if catalog is None:
+                catalog = cls.from_rows(db.get_items())
+                cls._instances[key] = catalog
+                logger.info("Item catalog loaded: %s items in %s categories",
+                            len(catalog), len(catalog.by_category))
+            return catalog
+
+    def __len__(self):
+        return len(self.types)
+
+    def __contains__(self, item_id):
+        return item_id in self.by_id
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def in_category(self, category):
+        return self.by_category.get(category, ())
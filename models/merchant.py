@@ -1,104 +1,147 @@
+import logging
 import pygame
 import math
-from models.item import Item
+from collections import deque
+from models.inventory import InventoryStore
+from models.item_catalog import ItemCatalog
+from database.db_handler import DatabaseHandler
+
+logger = logging.getLogger(__name__)
 
 class Merchant:
-    def __init__(self, x, y):
-        print(f"Initializing Merchant at position ({x}, {y})")
+    def __init__(self, x, y, db=None, inventory=None):
+        logger.debug("Initializing Merchant at position (%s, %s)", x, y)
+        self.db = db or DatabaseHandler.shared()
+        self.id = 1  # Row in the merchants table (there is a single player merchant)
         # Assign the merchant's current position
         self.x = x  # Current x position
         self.y = y  # Current y position
         self.target_x = x  # Destination x position
         self.target_y = y  # Destination y position
         self.speed = 2  # Movement speed (pixels per frame)
+        self.waypoints = deque()  # Remaining (x, y, speed multiplier) route points
+        self.leg = None  # Current straight leg: (end x, end y, dir x, dir y, step)
+        self.leg_remaining = 0.0
         self.arrived_at_settlement = True  # Flag to indicate arrival
         self.gold = 100  # Starting gold
         self.cart_capacity = 50  # Maximum cargo capacity
         self.current_load = 0  # Current load
-        self.inventory = {}  # Inventory as {item_id: Item}
-        self.load_inventory()
+        # Dict-like {item_id: InventoryEntry} holding only the goods in the cart
+        if inventory is None:
+            inventory = InventoryStore(ItemCatalog.shared(self.db)).new_inventory()
+        self.inventory = inventory
+        logger.debug("Merchant inventory initialized with %s item types", len(self.inventory))
+
+    def set_route(self, waypoints):
+        """
+        Follow a list of (x, y, speed multiplier) waypoints; the last one is the target.
+        """
+        self.waypoints = deque(waypoints)
+        if self.waypoints:
+            self.target_x, self.target_y = self.waypoints[-1][0], self.waypoints[-1][1]
+        self.leg = None
+        self.arrived_at_settlement = False
+
+    def restore_route(self, waypoints, leg, leg_remaining):
+        """Resume a route saved mid-leg, e.g. from a snapshot."""
+        self.waypoints = deque(tuple(point) for point in waypoints)
+        self.leg = tuple(leg) if leg else None
+        self.leg_remaining = leg_remaining
+
+    def travel_to(self, x, y):
+        """Walk straight to a point."""
+        self.set_route([(x, y, 1.0)])
 
-    def load_inventory(self):
-        print("Loading merchant inventory...")
-        # Initialize merchant's inventory with zero quantities
-        items = Item.load_all_items()
-        for item in items:
-            self.inventory[item.id] = Item(
-                id=item.id,
-                name=item.name,
-                buy_price=item.buy_price,
-                sell_price=item.sell_price,
-                description=item.description,
-                category=item.category,
-                quantity=0  # Start with zero quantity
-            )
-        print(f"Merchant inventory initialized with {len(self.inventory)} item types")
+    def teleport(self, x, y):
+        """Jump to a point and stop there."""
+        self.x = self.target_x = x
+        self.y = self.target_y = y
+        self.waypoints = deque()
+        self.leg = None
 
     def move(self):
         if self.x == self.target_x and self.y == self.target_y:
             if not self.arrived_at_settlement:
-                print("Merchant has arrived at destination")
+                logger.info("Merchant has arrived at destination")
             self.arrived_at_settlement = True
             return True
-        else:
-            self.arrived_at_settlement = False
-            dx = self.target_x - self.x
-            dy = self.target_y - self.y
-            distance = math.hypot(dx, dy)
-            if distance == 0:
-                return True
-            dx /= distance
-            dy /= distance
-            self.x += dx * self.speed
-            self.y += dy * self.speed
-            if math.hypot(self.target_x - self.x, self.target_y - self.y) < self.speed:
-                self.x = self.target_x
-                self.y = self.target_y
+        self.arrived_at_settlement = False
+        if self.leg is None and not self.start_next_leg():
+            return True
+
+        # Advance along the current leg; direction and length were computed once when it started
+        end_x, end_y, dir_x, dir_y, step = self.leg
+        self.leg_remaining -= step
+        if self.leg_remaining <= 0:
+            self.x, self.y = end_x, end_y
+            self.leg = None
+            if self.x == self.target_x and self.y == self.target_y and not self.waypoints:
                 self.arrived_at_settlement = True
                 return True
+        else:
+            self.x += dir_x * step
+            self.y += dir_y * step
+        return False
+
+    def start_next_leg(self):
+        """Set up the straight leg to the next waypoint (or to the target if the route is empty)."""
+        if self.waypoints:
+            end_x, end_y, speed_multiplier = self.waypoints.popleft()
+        else:
+            # Target was set directly rather than through a route
+            end_x, end_y, speed_multiplier = self.target_x, self.target_y, 1.0
+        dx = end_x - self.x
+        dy = end_y - self.y
+        distance = math.hypot(dx, dy)
+        if distance == 0:
+            if self.waypoints:
+                return self.start_next_leg()
+            self.x, self.y = self.target_x, self.target_y
             return False
+        self.leg = (end_x, end_y, dx / distance, dy / distance, self.speed * speed_multiplier)
+        self.leg_remaining = distance
+        return True
 
     def draw(self, screen, screen_pos):
         # Modified draw method to accept screen position
         pygame.draw.circle(screen, (255, 0, 0), screen_pos, 10)
 
     def add_item(self, item_id, quantity):
-        print(f"Merchant adding item ID {item_id} x{quantity}")
+        logger.debug("Merchant adding item ID %s x%s", item_id, quantity)
         if item_id in self.inventory:
             if self.current_load + quantity <= self.cart_capacity:
                 self.inventory[item_id].quantity += quantity
                 self.current_load += quantity
-                print(f"Added {quantity}x {self.inventory[item_id].name} to merchant's inventory.")
+                logger.debug("Added %sx %s to merchant's inventory.", quantity, self.inventory[item_id].name)
+            else:
+                logger.warning("Cannot add item: Cart capacity exceeded.")
+        elif self.inventory.store.has_item(item_id):
+            if self.current_load + quantity <= self.cart_capacity:
+                item = self.inventory.add(item_id, quantity)
+                self.current_load += quantity
+                logger.debug("Added new item to merchant's inventory: %s x%s", item.name, quantity)
             else:
-                print("Cannot add item: Cart capacity exceeded.")
+                logger.warning("Cannot add item: Cart capacity exceeded.")
         else:
-            item = Item.get_item_by_id(item_id)
-            if item:
-                if self.current_load + quantity <= self.cart_capacity:
-                    item.quantity = quantity
-                    self.inventory[item_id] = item
-                    self.current_load += quantity
-                    print(f"Added new item to merchant's inventory: {item.name} x{quantity}")
-                else:
-                    print("Cannot add item: Cart capacity exceeded.")
+            logger.warning("Cannot add item: Item %s is not in the item catalog.", item_id)
 
     def remove_item(self, item_id, quantity):
-        print(f"Merchant removing item ID {item_id} x{quantity}")
+        logger.debug("Merchant removing item ID %s x%s", item_id, quantity)
         if item_id in self.inventory:
             if self.inventory[item_id].quantity >= quantity:
                 item_name = self.inventory[item_id].name  # Store name before removal
                 self.inventory[item_id].quantity -= quantity
                 self.current_load -= quantity
-                print(f"Removed {quantity}x {item_name} from merchant's inventory.")
+                logger.debug("Removed %sx %s from merchant's inventory.", quantity, item_name)
                 
                 # Check if quantity is zero after removal
                 if self.inventory[item_id].quantity == 0:
-                    print(f"{item_name} removed from inventory as quantity is zero.")
+                    logger.debug("%s removed from inventory as quantity is zero.", item_name)
                     del self.inventory[item_id]
             else:
-                print("Cannot remove item: Not enough quantity.")
+                logger.warning("Cannot remove item: Not enough quantity.")
         else:
-            print("Cannot remove item: Item not in inventory.")
+            logger.warning("Cannot remove item: Item not in inventory.")
 
     def get_inventory_items(self):
         # Return only items with quantity > 0 to avoid empty entries
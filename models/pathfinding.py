@@ -0,0 +1,109 @@
+import heapq
+import math
+from collections import OrderedDict
+
+class RoutePlanner:
+    """
+    A* route planning over the road network with an LRU cache of routes.
+
+    Edge cost is travel time: road length divided by the speed multiplier of
+    the road class, so merchants prefer major roads when they are faster.
+    Cached routes only leave the cache by LRU eviction, since the road
+    network never changes during a session (see RoadNetwork).
+    """
+
+    # Travel speed multiplier per road class (off-road travel is 1.0)
+    ROAD_SPEEDS = {
+        "major": 1.5,
+        "regional": 1.25,
+        "local": 1.0
+    }
+
+    def __init__(self, road_network, cache_size=4096):
+        self.road_network = road_network
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (start id, goal id) -> route or None
+        self.hits = 0
+        self.misses = 0
+        self.max_speed = max(self.ROAD_SPEEDS.values())
+
+    def find_route(self, start_id, goal_id):
+        """
+        Return the fastest route between two settlements.
+
+        Returns:
+            List of (settlement id, road class) hops after the start, in travel
+            order, or None if the settlements are not connected by road
+        """
+        key = (start_id, goal_id)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+        route = self._a_star(start_id, goal_id)
+        self.cache[key] = route
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return route
+
+    def route_time(self, start_id, route):
+        """Travel time (in base-speed pixels) of a route returned by find_route."""
+        nodes = self.road_network.nodes
+        total = 0.0
+        current = nodes[start_id]
+        for settlement_id, road_class in route:
+            node = nodes[settlement_id]
+            total += math.hypot(node.x - current.x, node.y - current.y) / self.ROAD_SPEEDS[road_class]
+            current = node
+        return total
+
+    def travel_time(self, start_id, goal_id):
+        """
+        Travel time (in base-speed pixels) between two settlements.
+
+        Like Game.plan_route, merchants take the road route when it is faster
+        than walking straight there.
+        """
+        nodes = self.road_network.nodes
+        start, goal = nodes[start_id], nodes[goal_id]
+        direct = math.hypot(goal.x - start.x, goal.y - start.y)
+        route = self.find_route(start_id, goal_id)
+        if not route:
+            return direct
+        return min(direct, self.route_time(start_id, route))
+
+    def _a_star(self, start_id, goal_id):
+        nodes = self.road_network.nodes
+        if start_id not in nodes or goal_id not in nodes:
+            return None
+        if start_id == goal_id:
+            return []
+        goal = nodes[goal_id]
+
+        def heuristic(settlement_id):
+            node = nodes[settlement_id]
+            return math.hypot(goal.x - node.x, goal.y - node.y) / self.max_speed
+
+        open_heap = [(heuristic(start_id), 0.0, start_id)]
+        best_cost = {start_id: 0.0}
+        came_from = {}  # settlement id -> (previous id, road class)
+        while open_heap:
+            _, cost, current = heapq.heappop(open_heap)
+            if current == goal_id:
+                route = []
+                while current != start_id:
+                    previous, road_class = came_from[current]
+                    route.append((current, road_class))
+                    current = previous
+                route.reverse()
+                return route
+            if cost > best_cost.get(current, math.inf):
+                continue  # Stale heap entry
+            for neighbour, road_class, length in self.road_network.neighbours(current):
+                new_cost = cost + length / self.ROAD_SPEEDS[road_class]
+                if new_cost < best_cost.get(neighbour, math.inf):
+                    best_cost[neighbour] = new_cost
+                    came_from[neighbour] = (current, road_class)
+                    heapq.heappush(open_heap, (new_cost + heuristic(neighbour), new_cost, neighbour))
+        return None
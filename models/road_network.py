@@ -0,0 +1,86 @@
+import logging
+import math
+from models.spatial_index import SpatialGrid
+
+logger = logging.getLogger(__name__)
+
+class RoadNetwork:
+    """
+    Road graph between settlements, built once when settlements are loaded.
+
+    Nodes are settlement ids. Each edge is stored as
+    (from id, to id, road class, length) and mirrored in an adjacency list,
+    so drawing and routing never have to derive roads again. The network is
+    static for the whole session: settlements never move, appear or
+    disappear after loading, and snapshots only restore onto the world they
+    were taken on (see restore_state). RoutePlanner's route cache and the
+    world layer's road buckets rely on this and are never invalidated.
+    """
+
+    # Line layers (color, width) drawn for each road class, widest first
+    ROAD_STYLES = {
+        "major": [((101, 67, 33), 8), ((139, 69, 19), 6)],  # Between neighbouring capitals
+        "regional": [((139, 119, 101), 4)],  # Capital to its towns
+        "local": [((160, 140, 120), 2)]  # Town to nearby villages
+    }
+
+    REGIONAL_ROAD_RANGE = 1000  # Max distance from a capital to its towns
+    LOCAL_ROAD_RANGE = 500  # Max distance from a town to its villages
+    VILLAGES_PER_TOWN = 2
+    MAJOR_ROAD_NEIGHBOURS = 6  # Closest capitals each capital gets a major road to
+
+    def __init__(self, settlements):
+        self.build(settlements)
+
+    def build(self, settlements):
+        """Derive the road hierarchy from settlement types and positions."""
+        self.nodes = {s.id: s for s in settlements}
+        self.edges = []
+        self.adjacency = {s.id: [] for s in settlements}
+
+        capitals = [s for s in settlements if s.settlement_type == "capital"]
+        towns = [s for s in settlements if s.settlement_type == "town"]
+        villages = [s for s in settlements if s.settlement_type == "village"]
+
+        # 1. Major roads from each capital to its closest capitals (every pair in small worlds);
+        # a full mesh would be O(capitals^2) roads on generated worlds
+        capital_index = SpatialGrid(capitals, cell_size=self.REGIONAL_ROAD_RANGE)
+        position = {capital.id: index for index, capital in enumerate(capitals)}
+        pairs = set()
+        for i, capital in enumerate(capitals):
+            for other in capital_index.nearest(capital.x, capital.y, k=self.MAJOR_ROAD_NEIGHBOURS + 1):
+                j = position[other.id]
+                if j != i:
+                    pairs.add((min(i, j), max(i, j)))
+        for i, j in sorted(pairs):
+            self.add_edge(capitals[i], capitals[j], "major")
+
+        # 2. Regional roads from each town to its closest capital
+        for town in towns:
+            closest = capital_index.nearest(town.x, town.y)
+            if closest and self.distance(town, closest[0]) < self.REGIONAL_ROAD_RANGE:
+                self.add_edge(closest[0], town, "regional")
+
+        # 3. Local roads from towns to their closest villages
+        village_index = SpatialGrid(villages, cell_size=self.LOCAL_ROAD_RANGE)
+        for town in towns:
+            nearby_villages = [v for d, v in village_index.query_radius(town.x, town.y, self.LOCAL_ROAD_RANGE)
+                               if d < self.LOCAL_ROAD_RANGE]
+            for village in nearby_villages[:self.VILLAGES_PER_TOWN]:
+                self.add_edge(town, village, "local")
+
+        logger.info("Road network built: %s nodes, %s roads", len(self.nodes), len(self.edges))
+
+    def add_edge(self, a, b, road_class):
+        length = self.distance(a, b)
+        self.edges.append((a.id, b.id, road_class, length))
+        self.adjacency[a.id].append((b.id, road_class, length))
+        self.adjacency[b.id].append((a.id, road_class, length))
+
+    def neighbours(self, settlement_id):
+        """Return [(neighbour id, road class, length)] for a settlement."""
+        return self.adjacency.get(settlement_id, [])
+
+    @staticmethod
+    def distance(a, b):
+        return math.hypot(a.x - b.x, a.y - b.y)
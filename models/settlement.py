@@ -1,12 +1,14 @@
 import pygame
-import random
 from database.db_handler import DatabaseHandler
-from models.item import Item
+from models.inventory import InventoryStore
+from models.item_catalog import ItemCatalog
 import logging  # Ensure logging is imported
-from handlers.pricing_handler import PricingHandler
+
+logger = logging.getLogger(__name__)
 
 class Settlement:
-    def __init__(self, x, y, name, settlement_type, id=None):
+    def __init__(self, x, y, name, settlement_type, id=None, db=None, items_data=None, gold=1000, inventory=None):
+        self.db = db or DatabaseHandler.shared()
         self.x = x
         self.y = y
         self.name = name
@@ -27,72 +29,70 @@ class Settlement:
             self.size = 10
             self.color = (34, 139, 34)  # Forest Green
 
-        self.inventory = {}  # Inventory as {item_id: Item}
-        self.gold = 1000  # Starting gold for settlements
-        self.load_inventory()
+        # Dict-like {item_id: InventoryEntry}; the game gives every settlement a row of one shared store
+        if inventory is None:
+            inventory = InventoryStore(ItemCatalog.shared(self.db)).new_inventory()
+        self.inventory = inventory
+        self.gold = gold  # Starting gold for settlements
+        self.price_scheduler = None  # Set by PriceScheduler.watch to receive stock changes
+        self.stock_version = 0  # Bumped on every stock change so async price passes can detect stale input
+        self.load_inventory(items_data)
 
-    def load_inventory(self):
-        db = DatabaseHandler()
-        if self.id is not None:
-            items_data = db.get_settlement_items(self.id)
-            print(f"Raw items data: {[dict(item) for item in items_data]}")  # Debug raw data
+    def load_inventory(self, items_data=None):
+        # items_data lets bulk loaders hand over rows they already fetched
+        if items_data is not None or self.id is not None:
+            if items_data is None:
+                items_data = self.db.get_settlement_items(self.id)
             for data in items_data:
                 try:
-                    item = Item(
-                        id=data['id'],
-                        name=data['name'],
-                        buy_price=data['buy_price'],
-                        sell_price=data['sell_price'],
-                        description=data['description'],
-                        category=data['category'],
-                        quantity=data['quantity']
-                    )
-                    self.inventory[item.id] = item
-                    print(f"Successfully added to inventory: {item.name} x{item.quantity}")
+                    item = self.inventory.add(data['id'], data['quantity'], data['buy_price'], data['sell_price'])
+                    logger.debug("Successfully added to inventory: %s x%s", item.name, item.quantity)
                 except Exception as e:
-                    print(f"Error loading item: {e}")
-                    print(f"Data: {dict(data)}")
+                    logger.error("Error loading item: %s", e)
+                    logger.debug("Data: %r", data)
         else:
-            print("Settlement ID is None; skipping inventory load.")
+            logger.debug("Settlement ID is None; skipping inventory load.")
         
-        print(f"Total items in settlement inventory: {len(self.inventory)}")
-
-    def update_prices(self, game_tick):
-        # Only log price updates occasionally
-        if game_tick % 100 == 0:  # Match the update frequency in game.py
-            print(f"Updating prices for {self.name} (ID: {self.id})")
-            PricingHandler.update_settlement_prices(self)
+        logger.debug("Total items in settlement inventory: %s", len(self.inventory))
 
     def add_item(self, item_id, quantity):
-        print(f"Adding item ID {item_id} x{quantity} to Settlement ID {self.id}")
+        logger.debug("Adding item ID %s x%s to Settlement ID %s", item_id, quantity, self.id)
         if item_id in self.inventory:
             self.inventory[item_id].quantity += quantity
             self.gold += quantity * self.inventory[item_id].buy_price  # Update settlement's gold
-            print(f"Updated {self.inventory[item_id].name} quantity to {self.inventory[item_id].quantity}")
+            logger.debug("Updated %s quantity to %s", self.inventory[item_id].name, self.inventory[item_id].quantity)
+        elif self.inventory.store.has_item(item_id):
+            item = self.inventory.add(item_id, quantity)
+            self.gold += quantity * item.buy_price  # Update settlement's gold
+            logger.debug("Added new item to inventory: %s x%s", item.name, item.quantity)
         else:
-            item = Item.get_item_by_id(item_id)
-            if item:
-                item.quantity = quantity
-                self.inventory[item_id] = item
-                self.gold += quantity * item.buy_price  # Update settlement's gold
-                print(f"Added new item to inventory: {item.name} x{item.quantity}")
+            logger.warning("Item %s is not in the item catalog.", item_id)
+            return
+        self.mark_stock_changed()
 
     def remove_item(self, item_id, quantity):
-        print(f"Removing item ID {item_id} x{quantity} from Settlement ID {self.id}")
+        logger.debug("Removing item ID %s x%s from Settlement ID %s", item_id, quantity, self.id)
         if item_id in self.inventory:
             self.inventory[item_id].quantity -= quantity
             self.gold -= quantity * self.inventory[item_id].sell_price  # Update settlement's gold
-            print(f"Updated {self.inventory[item_id].name} quantity to {self.inventory[item_id].quantity}")
+            logger.debug("Updated %s quantity to %s", self.inventory[item_id].name, self.inventory[item_id].quantity)
             if self.inventory[item_id].quantity <= 0:
-                print(f"Quantity for {self.inventory[item_id].name} is zero or less. Removing from inventory.")
+                logger.debug("Quantity for %s is zero or less. Removing from inventory.", self.inventory[item_id].name)
                 del self.inventory[item_id]
+            self.mark_stock_changed()
         else:
-            print("Attempted to remove an item that doesn't exist in inventory.")
+            logger.warning("Attempted to remove an item that doesn't exist in inventory.")
 
         return list(self.inventory.values())
 
+    def mark_stock_changed(self):
+        """Flag this settlement for repricing after a trade or restock."""
+        self.stock_version += 1
+        if self.price_scheduler:
+            self.price_scheduler.mark_dirty(self)
+
     def get_inventory_items(self):
-        logging.debug(f"Retrieving inventory items for Settlement ID {self.id}")
+        logger.debug("Retrieving inventory items for Settlement ID %s", self.id)
         return list(self.inventory.values())
 
     def draw(self, screen):
@@ -0,0 +1,119 @@
+import heapq
+import math
+
+class SpatialGrid:
+    """
+    Uniform grid index over settlement positions.
+
+    Supports viewport range queries, radius queries, click hit-tests and
+    k-nearest lookups while only touching the cells around the query, so
+    they stay cheap as the number of settlements grows.
+    """
+
+    def __init__(self, settlements, cell_size=250):
+        self.cell_size = cell_size
+        self.build(settlements)
+
+    def build(self, settlements):
+        """(Re)index all settlements."""
+        self.cells = {}  # (cell x, cell y) -> [settlement]
+        self.count = 0
+        self.max_size = 0  # Largest settlement radius, for hit-test search range
+        self.min_cell = self.max_cell = None
+        for settlement in settlements:
+            self.insert(settlement)
+
+    def insert(self, settlement):
+        cell = self.cell_of(settlement.x, settlement.y)
+        self.cells.setdefault(cell, []).append(settlement)
+        self.count += 1
+        self.max_size = max(self.max_size, settlement.size)
+        if self.min_cell is None:
+            self.min_cell = self.max_cell = cell
+        else:
+            self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+            self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+
+    def remove(self, settlement):
+        cell = self.cell_of(settlement.x, settlement.y)
+        bucket = self.cells.get(cell, [])
+        if settlement in bucket:
+            bucket.remove(settlement)
+            self.count -= 1
+            if not bucket:
+                del self.cells[cell]
+
+    def cell_of(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def query_rect(self, left, top, width, height):
+        """Return settlements whose position lies inside the given world rectangle."""
+        first_x, first_y = self.cell_of(left, top)
+        last_x, last_y = self.cell_of(left + width, top + height)
+        result = []
+        for cell_y in range(first_y, last_y + 1):
+            for cell_x in range(first_x, last_x + 1):
+                for settlement in self.cells.get((cell_x, cell_y), ()):
+                    if left <= settlement.x <= left + width and top <= settlement.y <= top + height:
+                        result.append(settlement)
+        return result
+
+    def query_radius(self, x, y, radius):
+        """Return (distance, settlement) pairs within radius of a point, closest first."""
+        candidates = self.query_rect(x - radius, y - radius, radius * 2, radius * 2)
+        result = []
+        for settlement in candidates:
+            distance = math.hypot(settlement.x - x, settlement.y - y)
+            if distance <= radius:
+                result.append((distance, settlement))
+        result.sort(key=lambda pair: pair[0])
+        return result
+
+    def hit_test(self, x, y, padding=20):
+        """Return the closest settlement whose marker plus padding contains the point, or None."""
+        for distance, settlement in self.query_radius(x, y, self.max_size + padding):
+            if distance < settlement.size + padding:
+                return settlement
+        return None
+
+    def nearest(self, x, y, k=1, predicate=None):
+        """
+        Return up to k settlements closest to a point, closest first.
+
+        Args:
+            x, y: Query position in world coordinates
+            k: Number of settlements to return
+            predicate: Optional filter, e.g. lambda s: s.settlement_type == "capital"
+        """
+        if not self.count:
+            return []
+        center_x, center_y = self.cell_of(x, y)
+        max_ring = max(abs(center_x - self.min_cell[0]), abs(center_x - self.max_cell[0]),
+                       abs(center_y - self.min_cell[1]), abs(center_y - self.max_cell[1]))
+        best = []  # Max-heap of (-distance, tiebreak, settlement)
+        for ring in range(max_ring + 1):
+            # Every cell in this ring is at least (ring - 1) cells away from the point
+            if len(best) == k and -best[0][0] <= (ring - 1) * self.cell_size:
+                break
+            for cell in self._ring_cells(center_x, center_y, ring):
+                for settlement in self.cells.get(cell, ()):
+                    if predicate and not predicate(settlement):
+                        continue
+                    entry = (-math.hypot(settlement.x - x, settlement.y - y), id(settlement), settlement)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry[0] > best[0][0]:
+                        heapq.heapreplace(best, entry)
+        return [settlement for _, _, settlement in sorted(best, key=lambda e: -e[0])]
+
+    @staticmethod
+    def _ring_cells(center_x, center_y, ring):
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        for cell_x in range(center_x - ring, center_x + ring + 1):
+            yield (cell_x, center_y - ring)
+            yield (cell_x, center_y + ring)
+        for cell_y in range(center_y - ring + 1, center_y + ring):
+            yield (center_x - ring, cell_y)
+            yield (center_x + ring, cell_y)
@@ -57,7 +57,7 @@ def populate_settlement_items(db, settlement_id, item_quantities):
     print(f"Settlement ID {settlement_id} inventory populated.\n")
 
 def main():
-    db = DatabaseHandler()
+    db = DatabaseHandler.shared()
 
     # Check if 'items' table is empty
     items = db.get_items()
@@ -0,0 +1,235 @@
+"""
+Re-run a session recorded by EventJournal, headless and as fast as possible.
+Journaling is off unless main.py is given a --journal-dir:
+
+    python main.py --journal-dir journals
+    python replay.py journals/journal_20240101-120000.jsonl
+    python replay.py journals/journal_20240101-120000.jsonl --profile replay.prof
+
+The replay starts from the session's baseline snapshot and feeds the
+recorded player actions and price passes back into the simulation at the
+ticks they happened on. Price passes are recomputed rather than scheduled:
+an inline pass draws from the pricing generator when it is applied, and a
+pass that ran on the economy worker draws from the next seed of the
+worker's stream when it is submitted, so it lands on the same tick with the
+same prices as in the session. Regional economy steps are likewise started
+and applied on their recorded ticks. At the end of each session the state is
+hashed and compared with the digest the session recorded.
+"""
+import argparse
+import cProfile
+import logging
+import os
+import time
+import numpy as np
+
+# Replays never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from game import Game
+from database.journal import PRICE_EVENTS, read_journal, state_digest
+from database.snapshot import read_snapshot, restore_state
+from handlers.batch_pricing import PricingJob
+from handlers.economy_worker import sequence_from_state, sequence_state
+from handlers.trade_handler import OrderRejected
+
+logger = logging.getLogger(__name__)
+
+class ReplayDivergence(Exception):
+    """The replayed session no longer matches the journal."""
+
+class JournalScheduler:
+    """
+    Stands in for PriceScheduler during a replay.
+
+    Instead of deciding which settlements to reprice, it replays the price
+    passes the journal recorded for the current tick.
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.journal = None
+
+    def watch(self, settlements, game_tick=0):
+        for settlement in settlements:
+            settlement.price_scheduler = self
+
+    def mark_dirty(self, settlement):
+        pass  # The journal already holds the passes this led to
+
+    def is_stale(self, settlement, game_tick):
+        return False
+
+    def recompute_now(self, settlement, game_tick):
+        pass
+
+    def update(self, game_tick):
+        return self.replay.apply_price_events(game_tick)
+
+class JournalReplay:
+    """Replays one journal file; see the module docstring."""
+
+    def __init__(self, journal_path, db_path=None):
+        self.journal_path = journal_path
+        self.db_path = db_path  # Overrides the world database recorded in the journal
+        self.game = None
+        self.events = 0
+        self.verified = 0  # Sessions whose end state matched the recorded digest
+        self._entries = read_journal(journal_path)
+        self._next = None
+        self._jobs = {}  # Recorded pass sequence -> PricingJob, or PriceSnapshot of a worker pass
+        self._worker_seeds = None  # SeedSequence of the session's economy worker, if it had one
+
+    def run(self):
+        """
+        Replay every session in the journal.
+
+        Returns:
+            Dict with the replayed ticks and events, elapsed seconds, ticks/sec and verified sessions
+
+        Raises:
+            ReplayDivergence: If the replay drifts from the recorded session
+        """
+        start_time = time.perf_counter()
+        ticks = 0
+        while self._peek() is not None:
+            entry = self._peek()
+            if entry["type"] == "session":
+                self._take()
+                self._start_session(entry)
+            elif entry["tick"] > self.game.game_tick:
+                self.game.update()
+                ticks += 1
+            elif entry["tick"] < self.game.game_tick or entry["type"] in PRICE_EVENTS:
+                raise ReplayDivergence(f"{entry['type']} event for tick {entry['tick']} was not replayed "
+                                       f"(replay is at tick {self.game.game_tick})")
+            else:
+                self._take()
+                self._apply_input(entry)
+        if self.game:
+            self.game.shutdown()
+        elapsed = time.perf_counter() - start_time
+        logger.info("Replayed %s ticks and %s events in %.2fs", ticks, self.events, elapsed)
+        return {"ticks": ticks, "events": self.events, "seconds": elapsed,
+                "ticks_per_sec": ticks / elapsed if elapsed > 0 else 0.0, "verified": self.verified}
+
+    def apply_price_events(self, game_tick):
+        """Run the price passes recorded for this tick; called from JournalScheduler.update."""
+        engine = self.game.pricing_engine
+        applied = 0
+        while self._peek() is not None and self._peek()["type"] in PRICE_EVENTS \
+                and self._peek()["tick"] == game_tick:
+            entry = self._take()
+            if entry["type"] in ("economy_submit", "economy_apply"):
+                self._apply_economy_event(entry)
+                continue
+            if entry["type"] == "price_submit":
+                by_id = self._settlements_by_id
+                job = engine.snapshot([by_id[i] for i in entry["settlements"]])
+                if entry["worker"]:
+                    if self._worker_seeds is None:
+                        raise ReplayDivergence(f"Price pass {entry['sequence']} ran on an economy worker "
+                                               f"the session did not have")
+                    # Seeded in submit order like EconomyWorker.submit, whether or not the pass is applied
+                    job = engine.compute(job, np.random.default_rng(self._worker_seeds.spawn(1)[0]))
+                self._jobs[entry["sequence"]] = job
+                continue
+            pending = self._jobs.pop(entry["sequence"], None)
+            if pending is None:
+                raise ReplayDivergence(f"Price pass {entry['sequence']} was applied but never submitted")
+            if isinstance(pending, PricingJob):
+                pending = engine.compute(pending, engine.rng)  # An inline pass advances the engine's generator
+            engine.apply(pending)
+            applied += len(pending.job.settlement_ids)
+        return applied
+
+    def _apply_economy_event(self, entry):
+        """Start or finish a regional economy step where the session did; it is priced inline here."""
+        economy = self.game.regional_economy
+        if economy is None:
+            raise ReplayDivergence(f"Economy step {entry['step']} recorded without a regional economy")
+        if entry["type"] == "economy_submit":
+            step = economy.submit(background=False)
+        else:
+            finished = economy.collect(wait=True)
+            step = finished[0] if finished else None
+        if step != entry["step"]:
+            raise ReplayDivergence(f"Economy step {entry['step']} replayed as step {step}")
+
+    def _start_session(self, entry):
+        """Load the session's baseline snapshot, creating the game on the first session."""
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        header, arrays = read_snapshot(os.path.join(directory, entry["snapshot"]))
+        if self.game is None:
+            self.game = Game(headless=True, db_path=self.db_path or entry["db"], persist=False, load_stock=False,
+                             regional_economy=bool(entry["regional"]))
+            self.game.price_scheduler = JournalScheduler(self)
+            self._settlements_by_id = {settlement.id: settlement for settlement in self.game.settlements}
+        restore_state(self.game, header, arrays)
+        worker_state = header["rng"].get("worker")
+        self._worker_seeds = None if worker_state is None else sequence_from_state(worker_state)
+        if entry["regional"]:
+            self.game.regional_economy.set_state(entry["regional"])
+        self._jobs.clear()
+        logger.info("Replaying session from %s (tick %s)", entry["snapshot"], self.game.game_tick)
+
+    def _apply_input(self, entry):
+        game = self.game
+        event_type = entry["type"]
+        if event_type == "destination":
+            game.set_destination(self._settlements_by_id[entry["settlement"]])
+        elif event_type == "travel":
+            game.travel_to(entry["x"], entry["y"])
+        elif event_type == "teleport":
+            game.teleport(entry["x"], entry["y"])
+        elif event_type == "leave_trading":
+            game.leave_trading()
+        elif event_type == "order":
+            settlement = self._settlements_by_id[entry["settlement"]]
+            try:
+                game.trade_handler.execute_order(game.merchant, settlement, entry["lines"])
+            except OrderRejected as e:
+                raise ReplayDivergence(f"Order at tick {entry['tick']} was rejected on replay: {e}") from e
+        elif event_type == "session_end":
+            worker_state = None if self._worker_seeds is None else sequence_state(self._worker_seeds)
+            if state_digest(game, worker_state) != entry["digest"]:
+                raise ReplayDivergence(f"State at tick {entry['tick']} differs from the recorded session")
+            self.verified += 1
+        else:
+            logger.warning("Skipping unknown journal event %s", event_type)
+
+    def _peek(self):
+        if self._next is None:
+            self._next = next(self._entries, None)
+        return self._next
+
+    def _take(self):
+        entry = self._peek()
+        self._next = None
+        self.events += 1
+        return entry
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a recorded game journal headless.")
+    parser.add_argument("journal", help="Journal file written by a session run with --journal-dir")
+    parser.add_argument("--db", default=None,
+                        help="World database to replay on (default: the one recorded in the journal)")
+    parser.add_argument("--profile", default=None,
+                        help="Write cProfile stats of the replay to this file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    replay = JournalReplay(args.journal, db_path=args.db)
+    if args.profile:
+        profiler = cProfile.Profile()
+        stats = profiler.runcall(replay.run)
+        profiler.dump_stats(args.profile)
+    else:
+        stats = replay.run()
+    print(f"Replayed {stats['ticks']} ticks and {stats['events']} events in {stats['seconds']:.2f}s "
+          f"({stats['ticks_per_sec']:.0f} ticks/sec); {stats['verified']} session(s) verified")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import logging
+import threading
+import zlib
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+class RngStreams:
+    """
+    Independent, seedable random number streams, one per subsystem.
+
+    Every stream is a numpy Generator derived from one root seed and the
+    stream's name, so drawing more from one subsystem (say, pricing) never
+    shifts the sequence another one (say, restock) sees, and a run is
+    reproduced by reusing its root seed. Streams are created on first use.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, seed=None, stream_seeds=None):
+        root = np.random.SeedSequence(seed)
+        self.seed = root.entropy  # Chosen by the OS when seed is None; logged so the run can be repeated
+        self.stream_seeds = dict(stream_seeds or {})  # Per-stream overrides of the root seed
+        self._generators = {}
+
+    @classmethod
+    def shared(cls):
+        """Process-wide streams seeded from config.RNG_SEED and config.RNG_STREAM_SEEDS."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(config.RNG_SEED, config.RNG_STREAM_SEEDS)
+                logger.info("Random streams seeded with %s", cls._shared.seed)
+            return cls._shared
+
+    @classmethod
+    def reseed(cls, seed, stream_seeds=None):
+        """Replace the shared streams, e.g. so a benchmark run is repeatable."""
+        with cls._shared_lock:
+            cls._shared = cls(seed, stream_seeds)
+            return cls._shared
+
+    def sequence(self, name):
+        """The SeedSequence a stream is drawn from."""
+        if name in self.stream_seeds:
+            return np.random.SeedSequence(self.stream_seeds[name])
+        # Keyed by a hash of the name rather than creation order, so adding a stream moves no other
+        return np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(name.encode("utf-8")),))
+
+    def get(self, name):
+        """The Generator of a stream; the same object on every call."""
+        generator = self._generators.get(name)
+        if generator is None:
+            generator = self._generators[name] = np.random.default_rng(self.sequence(name))
+        return generator
+
+    def seed_for(self, name):
+        """An integer seed derived from a stream, for code that seeds its own generators."""
+        return int(self.sequence(name).generate_state(1, np.uint64)[0])
+
+    def get_state(self):
+        """Generator states of the streams used so far, as plain data."""
+        return {name: generator.bit_generator.state for name, generator in self._generators.items()}
+
+    def set_state(self, state):
+        for name, generator_state in state.items():
+            self.get(name).bit_generator.state = generator_state
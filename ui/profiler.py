@@ -0,0 +1,120 @@
+import logging
+import json
+import time
+import pygame
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class FrameProfiler:
+    """
+    Rolling per-phase frame timings with an on-screen overlay.
+
+    The game loop wraps each phase in phase(name); nested sub-phases (such as
+    the price pass inside update) are recorded under their own names. The
+    overlay shows average and p95 time per phase, frame-time percentiles and a
+    sparkline of recent frames, and dump() writes the last frames to a file.
+    """
+
+    PANEL_WIDTH = 300
+    SPARKLINE_FRAMES = 120
+    SPARKLINE_HEIGHT = 40
+    REFRESH_FRAMES = 15  # Overlay text is re-rendered this often, not every frame
+
+    def __init__(self, history=600):
+        self.frames = deque(maxlen=history)  # Each frame: {phase name: ms, "frame": ms}
+        self.visible = False
+        self.current = {}
+        self.frame_start = None
+        self.panel = None
+        self.frames_since_refresh = 0
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        self.current["frame"] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames.append(self.current)
+        self.frame_start = None
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent inside the block to this frame's total for name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] = self.current.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def phase_names(self):
+        names = []
+        for frame in self.frames:
+            for name in frame:
+                if name != "frame" and name not in names:
+                    names.append(name)
+        return names
+
+    def percentiles(self, name="frame", points=(50, 95, 99)):
+        """Return {point: ms} over the recorded frames (frames without the phase count as 0)."""
+        values = sorted(frame.get(name, 0.0) for frame in self.frames)
+        if not values:
+            return {point: 0.0 for point in points}
+        return {point: values[min(len(values) - 1, int(len(values) * point / 100))] for point in points}
+
+    def dump(self, path=None, count=None):
+        """
+        Write the last count frames (all by default) to a JSON lines file.
+
+        Returns:
+            Path of the written file
+        """
+        if path is None:
+            path = time.strftime("profile_%Y%m%d_%H%M%S.jsonl")
+        frames = list(self.frames)[-count:] if count else list(self.frames)
+        with open(path, "w") as dump_file:
+            for frame in frames:
+                dump_file.write(json.dumps(frame) + "\n")
+        logger.info("Profiler: wrote %s frames to %s", len(frames), path)
+        return path
+
+    def draw(self, screen, text_cache):
+        """Draw the overlay in the top-right corner of the screen."""
+        self.frames_since_refresh += 1
+        if self.panel is None or self.frames_since_refresh >= self.REFRESH_FRAMES:
+            self.panel = self.render_panel(text_cache)
+            self.frames_since_refresh = 0
+        screen.blit(self.panel, (screen.get_width() - self.PANEL_WIDTH, 0))
+
+    def render_panel(self, text_cache):
+        lines = [("PROFILER (F4 hide, F5 dump)", (255, 255, 0))]
+        frame = self.percentiles("frame")
+        lines.append((f"frame p50 {frame[50]:.2f}  p95 {frame[95]:.2f}  p99 {frame[99]:.2f} ms",
+                      (255, 255, 255)))
+        count = len(self.frames) or 1
+        for name in self.phase_names():
+            average = sum(f.get(name, 0.0) for f in self.frames) / count
+            p95 = self.percentiles(name, (95,))[95]
+            lines.append((f"{name:<14} avg {average:6.2f}  p95 {p95:6.2f} ms", (200, 200, 200)))
+
+        height = 10 + len(lines) * 18 + self.SPARKLINE_HEIGHT + 10
+        panel = pygame.Surface((self.PANEL_WIDTH, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 200))
+        y = 5
+        for text, color in lines:
+            panel.blit(text_cache.render(text, 18, color), (8, y))
+            y += 18
+
+        # Sparkline of recent frame times; bars over 16.7ms (60 FPS budget) are red
+        recent = [f["frame"] for f in list(self.frames)[-self.SPARKLINE_FRAMES:]]
+        scale = self.SPARKLINE_HEIGHT / max(max(recent, default=0.0), 1000 / 60)
+        bar_width = max(1, (self.PANEL_WIDTH - 16) // self.SPARKLINE_FRAMES)
+        base_y = y + 5 + self.SPARKLINE_HEIGHT
+        for i, frame_ms in enumerate(recent):
+            bar_height = max(1, int(frame_ms * scale))
+            color = (220, 60, 60) if frame_ms > 1000 / 60 else (60, 200, 60)
+            pygame.draw.rect(panel, color, (8 + i * bar_width, base_y - bar_height, bar_width, bar_height))
+        return panel
@@ -0,0 +1,59 @@
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    """
+    Shared font registry plus an LRU cache of rendered text surfaces.
+
+    Fonts are created once per size and rendered surfaces are reused while the
+    same (text, size, color) keeps being drawn, which keeps font construction
+    and glyph rasterization out of the per-frame path.
+    """
+    _shared = None
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.fonts = {}  # size -> pygame.font.Font
+        self.surfaces = OrderedDict()  # (text, size, color) -> Surface
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide cache used by all UI drawing."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get_font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+
+    def render(self, text, size, color):
+        """Return an antialiased surface for text, rendering it only on a cache miss."""
+        key = (text, size, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.get_font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        """Hit/miss counters and current size, e.g. for debug overlays."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.surfaces),
+            "fonts": len(self.fonts)
+        }
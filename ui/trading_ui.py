@@ -1,33 +1,44 @@
+import logging
 import pygame
+from ui.text_cache import TextCache
+from handlers.trade_handler import BUY, SELL, OrderLine, OrderRejected, TradeHandler
+
+logger = logging.getLogger(__name__)
+
+# Units moved by a shift-click
+BULK_QUANTITY = 10
 
 class TradingUI:
-    def __init__(self, screen_width, screen_height):
-        self.font = pygame.font.Font(None, 24)
+    def __init__(self, screen_width, screen_height, trade_handler=None):
+        self.text_cache = TextCache.shared()
         self.width = screen_width
         self.height = screen_height
         self.current_category = None
-        print("Trading UI initialized")
+        self.trade_handler = trade_handler or TradeHandler()
+        logger.info("Trading UI initialized")
 
-    def handle_click(self, mouse_pos, settlement, merchant):
-        # Only log when actual interaction happens
+    def handle_click(self, mouse_pos, settlement, merchant, bulk=False):
+        # A bulk (shift) click trades up to BULK_QUANTITY units in one order
         if self.is_buy_area(mouse_pos):
             clicked_item = self.get_clicked_item(mouse_pos, settlement)
             if clicked_item:
-                print(f"Attempting to buy {clicked_item.name}")
-                self.buy_item(merchant, settlement, clicked_item)
+                logger.debug("Attempting to buy %s", clicked_item.name)
+                space = merchant.cart_capacity - merchant.current_load
+                quantity = max(1, min(BULK_QUANTITY, clicked_item.quantity, space)) if bulk else 1
+                self.buy_item(merchant, settlement, clicked_item, quantity)
         elif self.is_sell_area(mouse_pos):
             clicked_item = self.get_clicked_item_from_merchant(mouse_pos, merchant)
             if clicked_item:
-                print(f"Attempting to sell {clicked_item.name}")
-                self.sell_item(merchant, settlement, clicked_item)
+                logger.debug("Attempting to sell %s", clicked_item.name)
+                quantity = min(BULK_QUANTITY, clicked_item.quantity) if bulk else 1
+                self.sell_item(merchant, settlement, clicked_item, quantity)
 
     def draw(self, screen, settlement, merchant):
         # Draw trading interface background
         pygame.draw.rect(screen, (50, 50, 50), (50, 50, self.width - 100, self.height - 100))
         
         # Draw settlement name
-        title_font = pygame.font.Font(None, 36)
-        title_surface = title_font.render(f"Trading with {settlement.name}", True, (255, 255, 255))
+        title_surface = self.text_cache.render(f"Trading with {settlement.name}", 36, (255, 255, 255))
         screen.blit(title_surface, (self.width//2 - title_surface.get_width()//2, 60))
 
         # Draw settlement inventory (left side)
@@ -35,13 +46,13 @@ class TradingUI:
         pygame.draw.rect(screen, (70, 70, 70), (75, 95, self.width//2 - 100, self.height - 200))
         settlement_items = settlement.get_inventory_items()
         if not settlement_items:
-            text_surface = self.font.render("No items available", True, (255, 255, 255))
+            text_surface = self.text_cache.render("No items available", 24, (255, 255, 255))
             screen.blit(text_surface, (100, y_offset))
         else:
             for item in settlement_items:
                 if item.quantity > 0:  # Only show items with stock
                     item_text = f"{item.name} - Buy: {item.buy_price}g - Stock: {item.quantity}"
-                    text_surface = self.font.render(item_text, True, (255, 255, 255))
+                    text_surface = self.text_cache.render(item_text, 24, (255, 255, 255))
                     screen.blit(text_surface, (100, y_offset))
                     y_offset += 30
 
@@ -50,18 +61,18 @@ class TradingUI:
         pygame.draw.rect(screen, (70, 70, 70), (self.width//2 + 25, 95, self.width//2 - 100, self.height - 200))
         merchant_items = merchant.get_inventory_items()
         if not merchant_items:
-            text_surface = self.font.render("No items in inventory", True, (255, 255, 255))
+            text_surface = self.text_cache.render("No items in inventory", 24, (255, 255, 255))
             screen.blit(text_surface, (self.width//2 + 50, y_offset))
         else:
             for item in merchant_items:
                 if item.quantity > 0:  # Only show items merchant has
                     item_text = f"{item.name} - Sell: {item.sell_price}g - Own: {item.quantity}"
-                    text_surface = self.font.render(item_text, True, (255, 255, 255))
+                    text_surface = self.text_cache.render(item_text, 24, (255, 255, 255))
                     screen.blit(text_surface, (self.width//2 + 50, y_offset))
                     y_offset += 30
 
         # Draw merchant's gold
-        gold_text = self.font.render(f"Your Gold: {merchant.gold}g", True, (255, 215, 0))
+        gold_text = self.text_cache.render(f"Your Gold: {merchant.gold}g", 24, (255, 215, 0))
         screen.blit(gold_text, (self.width//2 - gold_text.get_width()//2, self.height - 40))
 
     def get_clicked_item(self, mouse_pos, settlement):
@@ -90,33 +101,18 @@ class TradingUI:
     def is_sell_area(self, mouse_pos):
         return self.width//2 + 25 <= mouse_pos[0] <= self.width - 75
 
-    def buy_item(self, merchant, settlement, item):
-        print(f"Executing buy operation for item ID {item.id}: {item.name}")
-        if item.quantity > 0 and merchant.gold >= item.buy_price:
-            merchant.add_item(item.id, 1)
-            settlement.remove_item(item.id, 1)
-            merchant.gold -= item.buy_price
-            if hasattr(settlement, 'gold'):
-                settlement.gold += item.buy_price
-                print(f"Merchant bought {item.name} for {item.buy_price} gold.")
-            else:
-                print("Settlement does not have a gold attribute.")
-        else:
-            if item.quantity <= 0:
-                print("Cannot buy item: Item out of stock.")
-            if merchant.gold < item.buy_price:
-                print("Cannot buy item: Not enough gold.")
+    def buy_item(self, merchant, settlement, item, quantity=1):
+        logger.debug("Executing buy operation for item ID %s: %s x%s", item.id, item.name, quantity)
+        return self.place_order(merchant, settlement, [OrderLine(item.id, quantity, BUY)])
 
-    def sell_item(self, merchant, settlement, item):
-        print(f"Executing sell operation for item ID {item.id}: {item.name}")
-        if item.quantity > 0:
-            merchant.remove_item(item.id, 1)
-            settlement.add_item(item.id, 1)
-            merchant.gold += item.sell_price
-            if hasattr(settlement, 'gold'):
-                settlement.gold -= item.sell_price
-                print(f"Merchant sold {item.name} for {item.sell_price} gold.")
-            else:
-                print("Settlement does not have a gold attribute.")
-        else:
-            print("Cannot sell item: Merchant does not have this item.")
+    def sell_item(self, merchant, settlement, item, quantity=1):
+        logger.debug("Executing sell operation for item ID %s: %s x%s", item.id, item.name, quantity)
+        return self.place_order(merchant, settlement, [OrderLine(item.id, quantity, SELL)])
+
+    def place_order(self, merchant, settlement, lines):
+        """Execute an order basket; returns the TradeReceipt, or None if it was rejected."""
+        try:
+            return self.trade_handler.execute_order(merchant, settlement, lines)
+        except OrderRejected as e:
+            logger.info("Trade rejected: %s", e)
+            return None
@@ -0,0 +1,133 @@
+import pygame
+from collections import OrderedDict
+from models.road_network import RoadNetwork
+from ui.text_cache import TextCache
+
+class WorldLayerCache:
+    """
+    Pre-rendered static world layer split into square chunk surfaces.
+
+    Terrain, grid, roads and settlement markers with their names never change
+    during a session (the road network and settlements are static, see
+    RoadNetwork), so each chunk is rendered once on first sight and blitted
+    every frame after that. The least recently used chunks are dropped once
+    max_chunks are cached and re-rendered if they come back into view.
+    """
+
+    BACKGROUND_COLOR = (34, 139, 34)  # Green background for grass
+    GRID_COLOR = (0, 100, 0)
+    GRID_SIZE = 100
+    LABEL_COLOR = (255, 255, 255)
+    MAX_ROAD_WIDTH = max(width for styles in RoadNetwork.ROAD_STYLES.values() for _, width in styles)
+
+    def __init__(self, world_width, world_height, settlements, road_network, spatial_index,
+                 chunk_size=512, max_chunks=96):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.font = TextCache.shared().get_font(24)  # Labels are cached per settlement below
+        self.chunks = OrderedDict()  # (chunk x, chunk y) -> Surface
+        self.settlements = list(settlements)
+        self.road_network = road_network
+        self.spatial_index = spatial_index
+        self.labels = {s.id: self.font.render(s.name, True, self.LABEL_COLOR) for s in self.settlements}
+        # Widest distance a marker or name reaches from its settlement's position
+        self.label_reach = max([max(label.get_width()//2 + 1, label.get_height() + 30)
+                                for label in self.labels.values()] or [0])
+        self.chunk_roads = self.bucket_roads()
+
+    def bucket_roads(self):
+        """
+        Map each chunk to the roads drawn across it, in road network order.
+
+        Done once per world so rendering a chunk only visits its own roads
+        rather than every edge of the network.
+        """
+        size = self.chunk_size
+        reach = self.MAX_ROAD_WIDTH
+        nodes = self.road_network.nodes
+        buckets = {}  # (chunk x, chunk y) -> [edge]
+        for edge in self.road_network.edges:
+            a, b = nodes[edge[0]], nodes[edge[1]]
+            first_x, last_x = int((min(a.x, b.x) - reach) // size), int((max(a.x, b.x) + reach) // size)
+            first_y, last_y = int((min(a.y, b.y) - reach) // size), int((max(a.y, b.y) + reach) // size)
+            for chunk_y in range(first_y, last_y + 1):
+                for chunk_x in range(first_x, last_x + 1):
+                    bounds = pygame.Rect(chunk_x * size - reach, chunk_y * size - reach,
+                                         size + reach * 2, size + reach * 2)
+                    # Long diagonal roads cross only some of the chunks in their bounding box
+                    if bounds.clipline((a.x, a.y), (b.x, b.y)):
+                        buckets.setdefault((chunk_x, chunk_y), []).append(edge)
+        return buckets
+
+    def draw(self, screen, camera_x, camera_y):
+        """Blit the chunks visible at the given camera offset."""
+        screen.fill(self.BACKGROUND_COLOR)
+        view_width, view_height = screen.get_size()
+        size = self.chunk_size
+        first_x = max(0, int(-camera_x // size))
+        first_y = max(0, int(-camera_y // size))
+        last_x = min((self.world_width - 1) // size, int((view_width - camera_x) // size))
+        last_y = min((self.world_height - 1) // size, int((view_height - camera_y) // size))
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                screen.blit(self.get_chunk(chunk_x, chunk_y),
+                            (int(chunk_x * size + camera_x), int(chunk_y * size + camera_y)))
+
+    def get_chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self.render_chunk(chunk_x, chunk_y)
+            self.chunks[key] = surface
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return surface
+
+    def render_chunk(self, chunk_x, chunk_y):
+        size = self.chunk_size
+        left, top = chunk_x * size, chunk_y * size
+        bounds = pygame.Rect(left, top, size, size)
+        surface = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(self.BACKGROUND_COLOR)
+
+        # Grid lines inside the world bounds
+        for x in range(left - left % self.GRID_SIZE, min(left + size, self.world_width), self.GRID_SIZE):
+            if x >= left:
+                pygame.draw.line(surface, self.GRID_COLOR, (x - left, 0), (x - left, size))
+        for y in range(top - top % self.GRID_SIZE, min(top + size, self.world_height), self.GRID_SIZE):
+            if y >= top:
+                pygame.draw.line(surface, self.GRID_COLOR, (0, y - top), (size, y - top))
+
+        # Roads crossing this chunk
+        nodes = self.road_network.nodes
+        for from_id, to_id, road_class, _ in self.chunk_roads.get((chunk_x, chunk_y), ()):
+            a, b = nodes[from_id], nodes[to_id]
+            start = (a.x - left, a.y - top)
+            end = (b.x - left, b.y - top)
+            for color, width in RoadNetwork.ROAD_STYLES[road_class]:
+                pygame.draw.line(surface, color, start, end, width)
+
+        # Settlement markers and names overlapping this chunk
+        reach = self.label_reach
+        for settlement in self.spatial_index.query_rect(left - reach, top - reach,
+                                                        size + reach * 2, size + reach * 2):
+            if not self.settlement_bounds(settlement).colliderect(bounds):
+                continue
+            pos = (settlement.x - left, settlement.y - top)
+            pygame.draw.circle(surface, settlement.color, pos, settlement.size)
+            label = self.labels[settlement.id]
+            surface.blit(label, (pos[0] - label.get_width()//2, pos[1] + settlement.size + 5))
+        return surface
+
+    def settlement_bounds(self, settlement):
+        """World-space rectangle covered by a settlement's marker and name."""
+        label = self.labels[settlement.id]
+        half_width = max(settlement.size, label.get_width()//2 + 1)
+        return pygame.Rect(settlement.x - half_width, settlement.y - settlement.size,
+                           half_width * 2, settlement.size * 2 + 5 + label.get_height())